@@ -0,0 +1,234 @@
+"""Asyncio flavour of CountrySearchService, for API-style callers.
+
+Runs the same queries as CountrySearchService (built by its query
+helpers) over one pooled AsyncElasticsearch transport, and returns the
+results instead of printing them. Results are cached per normalized
+query in an LRU with a TTL, so popular queries skip the cluster, and
+concurrent misses for the same query share one request. Ingestion stays
+with CountrySearchService.reindex().
+
+The cache is dropped whenever the alias moves to another index version:
+the service re-resolves the alias at most every `alias_check_interval`
+seconds, whichever process did the reindex, so a swap shows up within
+that interval (or right away, through `invalidate()`).
+
+The default async transport needs aiohttp: pip install "elasticsearch[async]".
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+from country_search import ELASTICSEARCH_HOST, INDEX_NAME, CountrySearchService
+
+logger = logging.getLogger(__name__)
+
+# Cached query results, and how long each is served before going back to the cluster
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = 60.0
+# Seconds between checks of which index version the alias points at
+ALIAS_CHECK_INTERVAL = 5.0
+# Pooled HTTP connections kept per Elasticsearch node
+CONNECTIONS_PER_NODE = 10
+
+
+class SearchResult(NamedTuple):
+    total: int
+    # raw hits (_id, _score, _source); shared with the cache, so don't modify them
+    hits: List[Dict[str, Any]]
+
+
+class QueryCache:
+    """Bounded LRU of query results with a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _normalize(text: str) -> str:
+    # the normalized text is also what gets searched, so equal keys are equal
+    # queries. Case is kept: region/subregion are case-sensitive keyword terms
+    return " ".join(text.split())
+
+
+class AsyncCountrySearchService:
+
+    def __init__(
+        self,
+        es_client: AsyncElasticsearch,
+        index_name: str = INDEX_NAME,
+        cache_size: int = QUERY_CACHE_SIZE,
+        cache_ttl: float = QUERY_CACHE_TTL,
+        alias_check_interval: float = ALIAS_CHECK_INTERVAL,
+    ):
+        self.es_client = es_client
+        # the read alias CountrySearchService.reindex() swaps
+        self.index_name = index_name
+        self.cache = QueryCache(cache_size, cache_ttl)
+        self.alias_check_interval = alias_check_interval
+
+        self._live_index: Optional[str] = None
+        self._alias_checked_at = float("-inf")
+        # bumped by invalidate(), so results fetched before it aren't cached after it
+        self._generation = 0
+        # keyed by (generation, query key)
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+
+    @staticmethod
+    def create_client(
+        host: str = ELASTICSEARCH_HOST,
+        connections_per_node: int = CONNECTIONS_PER_NODE,
+        **kwargs: Any,
+    ) -> AsyncElasticsearch:
+        """An AsyncElasticsearch client whose connections are pooled and kept alive."""
+        return AsyncElasticsearch(hosts=[host], connections_per_node=connections_per_node, **kwargs)
+
+    async def __aenter__(self) -> "AsyncCountrySearchService":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self.es_client.close()
+
+    def invalidate(self) -> None:
+        """Forget every cached result, e.g. right after swapping the alias in this process."""
+        self._generation += 1
+        self.cache.clear()
+
+    async def search_countries_by_name(self, query_text: str) -> SearchResult:
+        query_text = _normalize(query_text)
+        return await self._cached(
+            ("name", query_text),
+            lambda: self._search(CountrySearchService._partial_match("name_common", query_text)),
+        )
+
+    async def search_by_region_and_population(self, region: str, min_population: int) -> SearchResult:
+        region = _normalize(region)
+        return await self._cached(
+            ("region_population", region, min_population),
+            lambda: self._search(CountrySearchService._region_population_query(region, min_population)),
+        )
+
+    async def search(self, query: str) -> SearchResult:
+        """The interactive search's multi-field query, best 20 matches first."""
+        query = _normalize(query)
+        return await self._cached(
+            ("comprehensive", query),
+            lambda: self._search(
+                CountrySearchService._comprehensive_query(query),
+                size=20,
+                sort=[{"_score": {"order": "desc"}}],
+            ),
+        )
+
+    async def aggregate_countries_by_subregion(self) -> Dict[str, int]:
+        async def fetch() -> Dict[str, int]:
+            response = await self.es_client.search(
+                index=self.index_name, body=CountrySearchService._subregion_aggregation()
+            )
+            buckets = response['aggregations']['subregion_count']['buckets']
+            return {bucket['key']: bucket['doc_count'] for bucket in buckets}
+
+        return await self._cached(("subregions",), fetch)
+
+    async def _search(self, query: Dict[str, Any], **params: Any) -> SearchResult:
+        response = await self.es_client.search(index=self.index_name, query=query, **params)
+        return SearchResult(response['hits']['total']['value'], response['hits']['hits'])
+
+    async def _check_alias(self) -> None:
+        """Drop the cache if the alias points at a different index version than last time."""
+        now = time.monotonic()
+        if now - self._alias_checked_at < self.alias_check_interval:
+            return
+        self._alias_checked_at = now
+
+        try:
+            live = ",".join(sorted(await self.es_client.indices.get_alias(name=self.index_name)))
+        except NotFoundError:
+            # not an alias (yet): a plain index of that name, or nothing at all
+            live = ""
+        if live != self._live_index:
+            if self._live_index is not None:
+                logger.info(f"{self.index_name} moved to {live or 'no index'}, clearing the query cache")
+                self.invalidate()
+            self._live_index = live
+
+    async def _cached(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        await self._check_alias()
+        value = self.cache.get(key)
+        if value is not None:
+            return value
+
+        generation = self._generation
+        flight = (generation, key)
+        future = self._in_flight.get(flight)
+        if future is not None:
+            # shielded: one cancelled caller mustn't cancel the others waiting on it
+            return await asyncio.shield(future)
+
+        future = self._in_flight[flight] = asyncio.ensure_future(fetch())
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            self._in_flight.pop(flight, None)
+        if generation == self._generation:
+            self.cache.set(key, value)
+        return value
+
+
+async def main() -> None:
+    queries = ["land", "Europe", "Paris", "united", "land", "Europe"]
+
+    async with AsyncCountrySearchService(AsyncCountrySearchService.create_client()) as service:
+        for round_ in ("cold", "warm"):
+            started = time.perf_counter()
+            results = await asyncio.gather(*(service.search(q) for q in queries))
+            elapsed = (time.perf_counter() - started) * 1000
+            logger.info(f"{round_}: {len(queries)} searches in {elapsed:.1f} ms")
+            for q, result in zip(queries, results):
+                names = ", ".join(hit['_source']['name_common'] for hit in result.hits[:3])
+                print(f"  {q!r}: {result.total} hit(s) - {names}")
+        logger.info(f"Query cache: {service.cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
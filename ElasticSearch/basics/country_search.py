@@ -1,9 +1,12 @@
+import re
 import time
-from typing import Dict, List, Optional, Any, Tuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Any
 import logging
 
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
 import requests
 
 # Configure logging
@@ -12,37 +15,162 @@ logger = logging.getLogger(__name__)
 
 # Constants
 ELASTICSEARCH_HOST = "http://localhost:9200"
+# Read alias; the documents live in versioned indices named "<alias>-<utc timestamp>"
 INDEX_NAME = "countries"
+# Index versions kept after a reindex: the live one plus the previous ones to roll back to
+KEEP_INDEX_VERSIONS = 2
 API_BASE_URL = "https://restcountries.com/v3.1"
 
+# Bulk ingest tuning: documents per bulk request, and how many requests are in
+# flight at once (1 = streaming_bulk on the calling thread, more = parallel_bulk)
+BULK_CHUNK_SIZE = 500
+BULK_THREAD_COUNT = 4
+
+# Gram lengths indexed into the `.ngram` subfields. Partial matches of a
+# length in this range are one term lookup there; anything else falls back
+# to a (slow, leading) wildcard query on the main field
+NGRAM_MIN = 2
+NGRAM_MAX = 15
+
 
 class CountrySearchService:
     
     def __init__(self, es_client: Elasticsearch, index_name: str = INDEX_NAME):
 
         self.es_client = es_client
+        # an alias: searches always go through it, ingestion never writes to it
         self.index_name = index_name
-        
-    def create_index_with_mapping(self) -> None:
-        """Create the countries index with proper field mappings."""
+        self._version_pattern = re.compile(rf"{re.escape(index_name)}-\d{{20}}")
+
+    def reindex(
+        self,
+        country_data: Iterable[Dict[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        thread_count: int = BULK_THREAD_COUNT,
+    ) -> bool:
+        """Load `country_data` into a new index version and switch searches over to it.
+
+        The alias keeps serving the previous version, complete, until the
+        new one is loaded and refreshed; the switch is one atomic alias
+        update, so no search ever sees an empty or half-built index.
+        """
+        new_index = self.create_index_with_mapping()
+        if not self.process_and_index_data(country_data, new_index, chunk_size, thread_count):
+            logger.error(f"Ingest into {new_index} failed; {self.index_name} stays as it was")
+            self.es_client.indices.delete(index=new_index)
+            return False
+
+        self.swap_alias(new_index)
+        self.garbage_collect_indices()
+        return True
+
+    def create_index_with_mapping(self) -> str:
+        """Create a new, empty version of the countries index; returns its name.
+
+        Each partially-matched text field gets an `.ngram` subfield holding
+        every NGRAM_MIN..NGRAM_MAX character substring of its (lowercased)
+        words, so "contains" searches are term lookups instead of wildcard scans.
+        """
+        ngram_subfield = {
+            "ngram": {"type": "text", "analyzer": "partial_ngram", "search_analyzer": "standard"}
+        }
         country_mapping = {
             "properties": {
-                "name_common": {"type": "text"},
-                "name_official": {"type": "text"},
+                "name_common": {"type": "text", "fields": ngram_subfield},
+                "name_official": {"type": "text", "fields": ngram_subfield},
                 "region": {"type": "keyword"},
                 "subregion": {"type": "keyword"},
-                "capital": {"type": "text"},
+                "capital": {"type": "text", "fields": ngram_subfield},
                 "population": {"type": "integer"},
                 "area": {"type": "float"}
             }
         }
+        index_settings = {
+            # ngram filters refuse a min/max spread above this (default 1)
+            "max_ngram_diff": NGRAM_MAX - NGRAM_MIN,
+            "analysis": {
+                "filter": {
+                    "partial_ngram": {"type": "ngram", "min_gram": NGRAM_MIN, "max_gram": NGRAM_MAX}
+                },
+                "analyzer": {
+                    # same words as the standard analyzer on the main field, then cut into grams
+                    "partial_ngram": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": ["lowercase", "partial_ngram"]
+                    }
+                }
+            }
+        }
         
-        if self.es_client.indices.exists(index=self.index_name):
-            logger.info(f"Deleting existing index: {self.index_name}")
-            self.es_client.indices.delete(index=self.index_name)
-        
-        logger.info(f"Creating new index: {self.index_name} with mappings")
-        self.es_client.indices.create(index=self.index_name, mappings=country_mapping)
+        # sorts in creation order, and never collides with a live version
+        new_index = f"{self.index_name}-{datetime.now(timezone.utc):%Y%m%d%H%M%S%f}"
+        logger.info(f"Creating new index: {new_index} with mappings")
+        self.es_client.indices.create(
+            index=new_index, settings=index_settings, mappings=country_mapping
+        )
+        return new_index
+
+    def _aliased_indices(self) -> List[str]:
+        """The indices the alias points at (normally one; none before the first swap)."""
+        try:
+            return list(self.es_client.indices.get_alias(name=self.index_name))
+        except NotFoundError:
+            return []
+
+    def swap_alias(self, new_index: str) -> None:
+        """Atomically point the alias at `new_index` instead of whatever it points at now."""
+        actions: List[Dict[str, Any]] = [
+            {"remove": {"index": index, "alias": self.index_name}}
+            for index in self._aliased_indices()
+        ]
+        if not actions and self.es_client.indices.exists(index=self.index_name):
+            # a concrete index from before versioning holds the name; drop it in the same step
+            logger.info(f"Replacing unversioned index {self.index_name} with an alias")
+            actions.append({"remove_index": {"index": self.index_name}})
+        actions.append({"add": {"index": new_index, "alias": self.index_name}})
+
+        self.es_client.indices.update_aliases(actions=actions)
+        logger.info(f"Alias {self.index_name} now points at {new_index}")
+
+    def garbage_collect_indices(self, keep: int = KEEP_INDEX_VERSIONS) -> List[str]:
+        """Delete old index versions, keeping the live one and the `keep - 1` before it.
+
+        Versions newer than the live one are left alone: they may be a
+        reindex still in progress. Returns the deleted index names.
+        """
+        live = self._aliased_indices()
+        if not live:
+            return []
+        versions = sorted(
+            index for index in self.es_client.indices.get(index=f"{self.index_name}-*")
+            if self._version_pattern.fullmatch(index)
+        )
+        older = [index for index in versions if index < min(live) and index not in live]
+        stale = older[:max(0, len(older) - (keep - 1))]
+        if stale:
+            logger.info(f"Deleting old index versions: {', '.join(stale)}")
+            self.es_client.indices.delete(index=stale)
+        return stale
+
+    @staticmethod
+    def _partial_match(field: str, text: str, boost: float = 1.0) -> Dict[str, Any]:
+        """Query for documents with a word in `field` containing `text`.
+
+        Matches exactly what `{"wildcard": {field: f"*{text}*"}}` does, with
+        the same constant score: a word contains `text` if and only if one
+        of its grams is `text`, as long as the length is within the gram range.
+        """
+        text = text.lower()
+        # user-typed * and ? keep their wildcard meaning
+        if not NGRAM_MIN <= len(text) <= NGRAM_MAX or any(c in text for c in "*?\\"):
+            return {"wildcard": {field: {"value": f"*{text}*", "boost": boost}}}
+        return {
+            "constant_score": {
+                "filter": {"term": {f"{field}.ngram": text}},
+                "boost": boost
+            }
+        }
 
     def fetch_countries_data(self) -> Optional[List[Dict[str, Any]]]:
 
@@ -59,52 +187,180 @@ class CountrySearchService:
             logger.error(f"Failed to fetch country data: {e}")
             return None
 
-    def process_and_index_data(self, country_data: List[Dict[str, Any]]) -> bool:
+    @staticmethod
+    def _country_to_doc(country: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name_common": country.get('name', {}).get('common', ''),
+            "name_official": country.get('name', {}).get('official', ''),
+            "region": country.get('region', 'N/A'),
+            "subregion": country.get('subregion', 'N/A'),
+            "capital": ", ".join(country.get('capital', [])),  # Capital is a list
+            "population": country.get('population', 0),
+            "area": country.get('area', 0.0)
+        }
 
-        actions = []
-        
+    def _generate_actions(self, country_data: Iterable[Dict[str, Any]], index: str) -> Iterator[Dict[str, Any]]:
+        """Yield one bulk action per country, so the whole batch never sits in memory."""
         for i, country in enumerate(country_data):
-            doc = {
-                "name_common": country.get('name', {}).get('common', ''),
-                "name_official": country.get('name', {}).get('official', ''),
-                "region": country.get('region', 'N/A'),
-                "subregion": country.get('subregion', 'N/A'),
-                "capital": ", ".join(country.get('capital', [])),  # Capital is a list
-                "population": country.get('population', 0),
-                "area": country.get('area', 0.0)
-            }
-            
-            action = {
-                "_index": self.index_name,
+            yield {
+                "_index": index,
                 "_id": i,
-                "_source": doc
+                "_source": self._country_to_doc(country)
             }
-            actions.append(action)
-        
-        logger.info(f"Preparing to index {len(actions)} documents...")
-        
+
+    @contextmanager
+    def _bulk_load_settings(self, index: str) -> Iterator[None]:
+        """Turn off refresh and replicas for a bulk load, then restore them and refresh once.
+
+        Without periodic refreshes and replica writes every document is
+        written once, into segments that are only opened for search at the
+        end; the explicit refresh makes the load visible as soon as it's done.
+        """
+        response = self.es_client.indices.get_settings(index=index)
+        current = next(iter(response.values()))['settings']['index']
+        # refresh_interval is absent unless it was set; None resets it to the default
+        original = {
+            "refresh_interval": current.get('refresh_interval'),
+            "number_of_replicas": current.get('number_of_replicas'),
+        }
+
+        logger.info("Disabling refresh and replicas for the bulk load")
+        self.es_client.indices.put_settings(
+            index=index,
+            settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+        )
         try:
-            success, failed = bulk(self.es_client, actions)
+            yield
+        finally:
+            logger.info(f"Restoring index settings: {original}")
+            self.es_client.indices.put_settings(index=index, settings={"index": original})
+            self.es_client.indices.refresh(index=index)
+
+    def process_and_index_data(
+        self,
+        country_data: Iterable[Dict[str, Any]],
+        index: str,
+        chunk_size: int = BULK_CHUNK_SIZE,
+        thread_count: int = BULK_THREAD_COUNT,
+    ) -> bool:
+        """Stream `country_data` into `index`, `chunk_size` documents per bulk request.
+
+        The documents are searchable when this returns.
+        """
+        actions = self._generate_actions(country_data, index)
+        if thread_count > 1:
+            results = parallel_bulk(
+                self.es_client, actions,
+                thread_count=thread_count, chunk_size=chunk_size, raise_on_error=False
+            )
+        else:
+            results = streaming_bulk(
+                self.es_client, actions, chunk_size=chunk_size, raise_on_error=False
+            )
+
+        logger.info(f"Indexing with chunk size {chunk_size} and {thread_count} thread(s)...")
+        indexed = failed = 0
+
+        try:
+            with self._bulk_load_settings(index):
+                started = chunk_started = time.perf_counter()
+                for ok, item in results:
+                    if ok:
+                        indexed += 1
+                    else:
+                        failed += 1
+                        logger.warning(f"Failed to index document: {item}")
+
+                    done = indexed + failed
+                    if done % chunk_size == 0:
+                        chunk_started = self._log_chunk(done, chunk_size, chunk_started)
+                # the last, partial chunk
+                done = indexed + failed
+                if done % chunk_size:
+                    self._log_chunk(done, done % chunk_size, chunk_started)
+
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Indexed {indexed:,} documents in {elapsed:.2f}s "
+                f"({indexed / elapsed if elapsed else 0:,.0f} docs/s)"
+            )
             if failed:
-                logger.warning(f"Failed to index {len(failed)} documents")
+                logger.warning(f"Failed to index {failed} documents")
                 return False
-            
-            logger.info(f"Successfully indexed {len(actions)} documents")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error during bulk indexing: {e}")
             return False
 
+    @staticmethod
+    def _log_chunk(done: int, size: int, chunk_started: float) -> float:
+        """Log the throughput of a chunk of `size` documents ending at `done`; returns the time now."""
+        now = time.perf_counter()
+        elapsed = now - chunk_started
+        rate = size / elapsed if elapsed else 0
+        logger.info(f"Chunk of {size} documents in {elapsed:.3f}s ({rate:,.0f} docs/s), {done:,} total")
+        return now
+
+    # Query builders, shared with AsyncCountrySearchService
+
+    @staticmethod
+    def _region_population_query(region: str, min_population: int) -> Dict[str, Any]:
+        return {
+            "bool": {
+                "must": {
+                    "range": {
+                        "population": {"gt": min_population}
+                    }
+                },
+                "filter": {
+                    "term": {
+                        "region": region
+                    }
+                }
+            }
+        }
+
+    @staticmethod
+    def _subregion_aggregation() -> Dict[str, Any]:
+        return {
+            "size": 0,  # We don't need actual documents, just aggregation results
+            "aggs": {
+                "subregion_count": {
+                    "terms": {
+                        "field": "subregion"
+                    }
+                }
+            }
+        }
+
+    @classmethod
+    def _comprehensive_query(cls, query: str) -> Dict[str, Any]:
+        """Multi-field search query"""
+        return {
+            "bool": {
+                "should": [
+                    # Exact matches (higher boost)
+                    {"match": {"name_common": {"query": query, "boost": 3.0}}},
+                    {"match": {"name_official": {"query": query, "boost": 2.5}}},
+                    {"term": {"region": {"value": query, "boost": 2.0}}},
+                    {"term": {"subregion": {"value": query, "boost": 2.0}}},
+                    {"match": {"capital": {"query": query, "boost": 1.8}}},
+                    
+                    # Partial matches (lower boost)
+                    cls._partial_match("name_common", query, boost=1.5),
+                    cls._partial_match("name_official", query, boost=1.2),
+                    cls._partial_match("capital", query, boost=1.0)
+                ],
+                "minimum_should_match": 1
+            }
+        }
+
     def search_countries_by_name(self, query_text: str) -> None:
 
         logger.info(f"Searching for countries with '{query_text}' in their name...")
         
-        query = {
-            "wildcard": {
-                "name_common": f"*{query_text}*"
-            }
-        }
+        query = self._partial_match("name_common", query_text)
         
         try:
             response = self.es_client.search(index=self.index_name, query=query)
@@ -121,20 +377,7 @@ class CountrySearchService:
 
         logger.info(f"Searching for countries in '{region}' with population > {min_population:,}...")
         
-        query = {
-            "bool": {
-                "must": {
-                    "range": {
-                        "population": {"gt": min_population}
-                    }
-                },
-                "filter": {
-                    "term": {
-                        "region": region
-                    }
-                }
-            }
-        }
+        query = self._region_population_query(region, min_population)
         
         try:
             response = self.es_client.search(index=self.index_name, query=query)
@@ -152,16 +395,7 @@ class CountrySearchService:
     def aggregate_countries_by_subregion(self) -> None:
         logger.info("Aggregating country counts by subregion...")
         
-        query_body = {
-            "size": 0,  # We don't need actual documents, just aggregation results
-            "aggs": {
-                "subregion_count": {
-                    "terms": {
-                        "field": "subregion"
-                    }
-                }
-            }
-        }
+        query_body = self._subregion_aggregation()
         
         try:
             response = self.es_client.search(index=self.index_name, body=query_body)
@@ -213,25 +447,7 @@ class CountrySearchService:
 
         print(f"\nSearching for: '{query}'...")
         
-        # Multi-field search query
-        search_query = {
-            "bool": {
-                "should": [
-                    # Exact matches (higher boost)
-                    {"match": {"name_common": {"query": query, "boost": 3.0}}},
-                    {"match": {"name_official": {"query": query, "boost": 2.5}}},
-                    {"term": {"region": {"value": query, "boost": 2.0}}},
-                    {"term": {"subregion": {"value": query, "boost": 2.0}}},
-                    {"match": {"capital": {"query": query, "boost": 1.8}}},
-                    
-                    # Partial matches (lower boost)
-                    {"wildcard": {"name_common": {"value": f"*{query.lower()}*", "boost": 1.5}}},
-                    {"wildcard": {"name_official": {"value": f"*{query.lower()}*", "boost": 1.2}}},
-                    {"wildcard": {"capital": {"value": f"*{query.lower()}*", "boost": 1.0}}}
-                ],
-                "minimum_should_match": 1
-            }
-        }
+        search_query = self._comprehensive_query(query)
         
         try:
             response = self.es_client.search(
@@ -314,22 +530,18 @@ def main() -> None:
     # Initialize service
     service = CountrySearchService(es_client, INDEX_NAME)
     
-    # Create index and mapping
-    service.create_index_with_mapping()
-    
-    # Fetch and index country data
+    # Fetch country data
     country_data = service.fetch_countries_data()
     if not country_data:
         logger.error("Failed to fetch country data, exiting...")
         return
     
-    if not service.process_and_index_data(country_data):
+    # Index it into a new version and swap the alias over; searches keep
+    # hitting the previous version until then, and the new one on return
+    if not service.reindex(country_data):
         logger.error("Failed to index country data, exiting...")
         return
     
-    # Wait for indexing to complete
-    time.sleep(1)
-    
     logger.info("\n" + "="*50)
     logger.info("Running search scenarios...")
     logger.info("="*50)
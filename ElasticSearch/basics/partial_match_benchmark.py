@@ -0,0 +1,136 @@
+"""Compare the n-gram partial matches against the wildcard queries they replaced.
+
+Indexes a fixture corpus (plus optional synthetic filler, so the term
+dictionary is big enough for leading wildcards to hurt), then for every
+query and field checks that both forms return exactly the same documents
+and reports each one's median server-side latency.
+
+    python partial_match_benchmark.py
+    python partial_match_benchmark.py --synthetic 200000
+
+Needs Elasticsearch at ELASTICSEARCH_HOST; works in its own alias and
+index versions and deletes them afterwards.
+"""
+import argparse
+import random
+import statistics
+from typing import Any, Dict, List, Set
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+
+from country_search import ELASTICSEARCH_HOST, CountrySearchService
+
+BENCHMARK_INDEX = "countries-partial-match-benchmark"
+FIELDS = ("name_common", "name_official", "capital")
+QUERIES = [
+    "land", "stan", "ia", "United", "rep", "guinea", "ingdom", "burg",
+    "south africa", "d'iv", "é", "x", "republicofthecongoo", "Saint",
+]
+REPEAT = 20
+
+
+def _country(common: str, official: str, capital: str, region: str, subregion: str) -> Dict[str, Any]:
+    return {
+        "name": {"common": common, "official": official},
+        "capital": [capital] if capital else [],
+        "region": region,
+        "subregion": subregion,
+        "population": 0,
+        "area": 0.0,
+    }
+
+
+FIXTURE = [
+    _country("Finland", "Republic of Finland", "Helsinki", "Europe", "Northern Europe"),
+    _country("Iceland", "Iceland", "Reykjavik", "Europe", "Northern Europe"),
+    _country("Thailand", "Kingdom of Thailand", "Bangkok", "Asia", "South-Eastern Asia"),
+    _country("Switzerland", "Swiss Confederation", "Bern", "Europe", "Western Europe"),
+    _country("New Zealand", "New Zealand", "Wellington", "Oceania", "Australia and New Zealand"),
+    _country("Kazakhstan", "Republic of Kazakhstan", "Astana", "Asia", "Central Asia"),
+    _country("Pakistan", "Islamic Republic of Pakistan", "Islamabad", "Asia", "Southern Asia"),
+    _country("United Kingdom", "United Kingdom of Great Britain and Northern Ireland", "London",
+             "Europe", "Northern Europe"),
+    _country("United States", "United States of America", "Washington, D.C.", "Americas", "North America"),
+    _country("Luxembourg", "Grand Duchy of Luxembourg", "Luxembourg", "Europe", "Western Europe"),
+    _country("Guinea-Bissau", "Republic of Guinea-Bissau", "Bissau", "Africa", "Western Africa"),
+    _country("Equatorial Guinea", "Republic of Equatorial Guinea", "Malabo", "Africa", "Middle Africa"),
+    _country("Papua New Guinea", "Independent State of Papua New Guinea", "Port Moresby",
+             "Oceania", "Melanesia"),
+    _country("South Africa", "Republic of South Africa", "Pretoria", "Africa", "Southern Africa"),
+    _country("Ivory Coast", "Republic of Côte d'Ivoire", "Yamoussoukro", "Africa", "Western Africa"),
+    _country("Réunion", "Réunion Island", "Saint-Denis", "Africa", "Eastern Africa"),
+    _country("Saint Lucia", "Saint Lucia", "Castries", "Americas", "Caribbean"),
+    _country("DR Congo", "Democratic Republic of the Congo", "Kinshasa", "Africa", "Middle Africa"),
+    _country("Mexico", "United Mexican States", "Mexico City", "Americas", "North America"),
+    _country("India", "Republic of India", "New Delhi", "Asia", "Southern Asia"),
+    _country("Indonesia", "Republic of Indonesia", "Jakarta", "Asia", "South-Eastern Asia"),
+    _country("Sri Lanka", "Democratic Socialist Republic of Sri Lanka", "Sri Jayawardenepura Kotte",
+             "Asia", "Southern Asia"),
+    _country("Antarctica", "Antarctica", "", "Antarctic", ""),
+    _country("Hamburg Test", "Free and Hanseatic City", "Hamburg", "Europe", "Western Europe"),
+]
+
+
+def _synthetic(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Made-up countries; mostly unique words, so they grow the term dictionary."""
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "ri", "sta", "nia", "bu", "rg", "an", "dor", "ve", "qu", "ith", "ez", "mon"]
+
+    def word() -> str:
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 5))).capitalize()
+
+    return [
+        _country(word(), f"Republic of {word()} {word()}", word(), "Synthetic", "Synthetic")
+        for _ in range(count)
+    ]
+
+
+def _ids(es_client: Elasticsearch, query: Dict[str, Any]) -> Set[str]:
+    return {hit["_id"] for hit in scan(es_client, index=BENCHMARK_INDEX, query={"query": query}, _source=False)}
+
+
+def _median_took(es_client: Elasticsearch, query: Dict[str, Any]) -> float:
+    took = [
+        es_client.search(index=BENCHMARK_INDEX, query=query, size=20, request_cache=False)["took"]
+        for _ in range(REPEAT)
+    ]
+    return statistics.median(took)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--synthetic", type=int, default=0, help="extra made-up countries to index")
+    args = parser.parse_args()
+
+    es_client = Elasticsearch(hosts=[ELASTICSEARCH_HOST])
+    service = CountrySearchService(es_client, BENCHMARK_INDEX)
+    if not service.reindex(FIXTURE + _synthetic(args.synthetic)):
+        raise SystemExit("indexing failed")
+
+    mismatches = 0
+    print(f"\n{'query':<22}{'field':<15}{'hits':>7}{'wildcard ms':>13}{'ngram ms':>10}")
+    try:
+        for text in QUERIES:
+            for field in FIELDS:
+                wildcard = {"wildcard": {field: {"value": f"*{text.lower()}*"}}}
+                partial = service._partial_match(field, text)
+
+                expected, actual = _ids(es_client, wildcard), _ids(es_client, partial)
+                if expected != actual:
+                    mismatches += 1
+                    print(f"MISMATCH {text!r} on {field}: "
+                          f"only wildcard {sorted(expected - actual)}, only ngram {sorted(actual - expected)}")
+
+                print(f"{text!r:<22}{field:<15}{len(expected):>7}"
+                      f"{_median_took(es_client, wildcard):>13.1f}{_median_took(es_client, partial):>10.1f}")
+    finally:
+        es_client.indices.delete(index=list(es_client.indices.get_alias(name=BENCHMARK_INDEX)))
+
+    print(f"\n{mismatches} mismatching result sets")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
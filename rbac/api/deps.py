@@ -1,13 +1,45 @@
+import time
+
 from starlette.requests import Request
 
-from core.database import async_session, db_session
+from core import metrics
+from core.database import session_scope
 
 
 async def db_session_middleware(request: Request, call_next):
-    async with async_session() as session:
-        token = db_session.set(session)
+    # sessions are only opened if the request actually needs the db
+    async with session_scope():
+        return await call_next(request)
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram.
+
+    Plain ASGI rather than `app.middleware("http")` so it doesn't add
+    another BaseHTTPMiddleware task hop to every request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_with_status)
         finally:
-            db_session.reset(token)
-        return response
+            # the route template, not the raw path, keeps label cardinality bounded
+            route = scope.get("route")
+            metrics.HTTP_LATENCY.labels(
+                scope["method"], route.path if route else "unmatched", status
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,30 @@
+from typing import Annotated
+
+import orjson
+from fastapi import HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from api.responses import NDJSON
+from services import listing
+from services.listing import MAX_PAGE_SIZE, InvalidCursor
+
+Cursor = Annotated[str | None, Query()]
+Limit = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+
+
+async def page_response(query: listing.Listing, cursor: str | None, limit: int) -> dict:
+    try:
+        items, next_cursor = await listing.page(query, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def _ndjson(query: listing.Listing):
+    async for batch in listing.stream(query):
+        yield b"".join(orjson.dumps(row) + b"\n" for row in batch)
+
+
+def export_response(query: listing.Listing) -> StreamingResponse:
+    """Every row as NDJSON, streamed through a server-side cursor."""
+    return StreamingResponse(_ndjson(query), media_type=NDJSON)
@@ -0,0 +1,22 @@
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+NDJSON = "application/x-ndjson"
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson, which is several times faster than the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+class RawJSONResponse(Response):
+    """A body that is already encoded JSON, sent as is."""
+
+    media_type = "application/json"
+
+
+# /check only ever answers one of two bodies
+HAS_PERMISSION = orjson.dumps({"has_permission": True})
+NO_PERMISSION = orjson.dumps({"has_permission": False})
@@ -0,0 +1,78 @@
+from typing import TypeVar
+
+from fastapi import APIRouter, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from api.responses import NDJSON
+from schemas.bulk import BulkResponse, BulkRowResult
+from schemas.role import AssignPermissionRequest, AssignRoleRequest, CreateRoleRequest
+from schemas.user import CreateUserRequest
+from services import permission_service as ps
+
+router = APIRouter(prefix="/bulk")
+
+T = TypeVar("T", bound=BaseModel)
+
+
+async def _read_rows(request: Request, model: type[T]) -> list[T]:
+    """Parse the body as a JSON array, or one object per line for NDJSON."""
+    body = await request.body()
+    if not request.headers.get("content-type", "").startswith(NDJSON):
+        try:
+            return TypeAdapter(list[model]).validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+
+    rows, errors = [], []
+    for i, line in enumerate(body.splitlines()):
+        if not line.strip():
+            continue
+        try:
+            rows.append(model.model_validate_json(line))
+        except ValidationError as e:
+            errors.extend(
+                {**err, "loc": ("body", i, *err["loc"])}
+                for err in e.errors(include_url=False)
+            )
+    if errors:
+        raise RequestValidationError(errors)
+    return rows
+
+
+def _response(results: list[ps.RowResult]) -> BulkResponse:
+    statuses = [r.status for r in results]
+    return BulkResponse(
+        created=statuses.count(ps.CREATED),
+        conflicts=statuses.count(ps.CONFLICT),
+        not_found=statuses.count(ps.NOT_FOUND),
+        results=[BulkRowResult(status=r.status, id=r.id) for r in results],
+    )
+
+
+@router.post("/users", response_model=BulkResponse)
+async def bulk_create_users(request: Request):
+    rows = await _read_rows(request, CreateUserRequest)
+    return _response(await ps.bulk_create_users([row.username for row in rows]))
+
+
+@router.post("/roles", response_model=BulkResponse)
+async def bulk_create_roles(request: Request):
+    rows = await _read_rows(request, CreateRoleRequest)
+    return _response(await ps.bulk_create_roles([row.name for row in rows]))
+
+
+@router.post("/assign-role", response_model=BulkResponse)
+async def bulk_assign_roles(request: Request):
+    rows = await _read_rows(request, AssignRoleRequest)
+    return _response(
+        await ps.bulk_assign_roles([(row.user_id, row.role_id, row.expires_at) for row in rows])
+    )
+
+
+@router.post("/assign-permission", response_model=BulkResponse)
+async def bulk_assign_permissions(request: Request):
+    rows = await _read_rows(request, AssignPermissionRequest)
+    return _response(
+        await ps.bulk_assign_permissions([(row.role_id, row.permission) for row in rows])
+    )
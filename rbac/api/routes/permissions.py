@@ -1,20 +1,51 @@
+from uuid import UUID
+
 from fastapi import APIRouter, Query
 
+from api.listing import Cursor, Limit, export_response, page_response
+from api.responses import HAS_PERMISSION, NO_PERMISSION, ORJSONResponse, RawJSONResponse
+from cache.local_cache import permission_cache
+from schemas.listing import Page, PermissionGrant
+from schemas.permission import BatchCheckRequest, BatchCheckResponse
+from services import listing
 from services import permission_service as ps
+from services.listing import DEFAULT_PAGE_SIZE
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
-@router.get("/users/{user_id}/permissions")
-async def get_user_permissions(user_id: str):
-    permissions = await ps.get_user_permission(user_id)
-    return {"permissions": sorted(permissions)}
+@router.get("/users/{user_id}/permissions", response_class=RawJSONResponse)
+async def get_user_permissions(user_id: UUID):
+    permissions = await ps.get_user_permission_json(user_id)
+    return RawJSONResponse(b'{"permissions":%s}' % permissions)
 
 
-@router.get("/check")
+@router.get("/check", response_class=RawJSONResponse)
 async def check_permission(
-    user_id: str = Query(),
+    user_id: UUID = Query(),
     permission: str = Query(),
 ):
     result = await ps.can(user_id, permission)
-    return {"has_permission": result}
+    return RawJSONResponse(HAS_PERMISSION if result else NO_PERMISSION)
+
+
+# returned as-is, so results skip response-model validation; `responses` only documents the shape
+@router.post("/check/batch", responses={200: {"model": BatchCheckResponse}})
+async def check_permissions_batch(body: BatchCheckRequest):
+    results = await ps.can_many((c.user_id, c.permission) for c in body.checks)
+    return ORJSONResponse({"results": results})
+
+
+@router.get("/permissions/{permission}/grants", response_model=Page[PermissionGrant])
+async def list_permission_grants(permission: str, cursor: Cursor = None, limit: Limit = DEFAULT_PAGE_SIZE):
+    return await page_response(listing.permission_grants(permission), cursor, limit)
+
+
+@router.get("/permissions/{permission}/grants/export")
+async def export_permission_grants(permission: str):
+    return export_response(listing.permission_grants(permission))
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return permission_cache.stats()
@@ -1,12 +1,20 @@
+from uuid import UUID
+
 from fastapi import APIRouter, HTTPException
 
+from api.listing import Cursor, Limit, export_response, page_response
+from schemas.listing import Page, RoleMember
 from schemas.role import (
+    AddRoleParentRequest,
     AssignPermissionRequest,
     AssignRoleRequest,
     CreateRoleRequest,
     RoleResponse,
 )
+from services import listing
 from services import permission_service as ps
+from services.listing import DEFAULT_PAGE_SIZE
+from services.role_hierarchy import RoleCycleError
 
 router = APIRouter()
 
@@ -19,7 +27,7 @@ async def create_role(body: CreateRoleRequest):
 
 @router.post("/assign-role")
 async def assign_role(body: AssignRoleRequest):
-    created = await ps.assign_role(body.user_id, body.role_id)
+    created = await ps.assign_role(body.user_id, body.role_id, body.expires_at)
     if not created:
         raise HTTPException(
             status_code=409,
@@ -37,3 +45,38 @@ async def assign_permission(body: AssignPermissionRequest):
             detail="Role already has this permission",
         )
     return {"success": True}
+
+
+@router.post("/roles/{role_id}/parents")
+async def add_role_parent(role_id: UUID, body: AddRoleParentRequest):
+    try:
+        created = await ps.add_role_parent(role_id, body.parent_id)
+    except RoleCycleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not created:
+        raise HTTPException(
+            status_code=409,
+            detail="Role already inherits from this parent",
+        )
+    return {"success": True}
+
+
+@router.delete("/roles/{role_id}/parents/{parent_id}")
+async def remove_role_parent(role_id: UUID, parent_id: UUID):
+    removed = await ps.remove_role_parent(role_id, parent_id)
+    if not removed:
+        raise HTTPException(
+            status_code=404,
+            detail="Role does not inherit from this parent",
+        )
+    return {"success": True}
+
+
+@router.get("/roles/{role_id}/members", response_model=Page[RoleMember])
+async def list_role_members(role_id: UUID, cursor: Cursor = None, limit: Limit = DEFAULT_PAGE_SIZE):
+    return await page_response(listing.role_members(role_id), cursor, limit)
+
+
+@router.get("/roles/{role_id}/members/export")
+async def export_role_members(role_id: UUID):
+    return export_response(listing.role_members(role_id))
@@ -1,7 +1,13 @@
+from uuid import UUID
+
 from fastapi import APIRouter
 
+from api.listing import Cursor, Limit, export_response, page_response
+from schemas.listing import AssignedRole, Page
 from schemas.user import CreateUserRequest, UserResponse
+from services import listing
 from services import permission_service as ps
+from services.listing import DEFAULT_PAGE_SIZE
 
 router = APIRouter()
 
@@ -10,3 +16,13 @@ router = APIRouter()
 async def create_user(body: CreateUserRequest):
     user = await ps.create_user(body.username)
     return UserResponse(id=user.id, username=user.username)
+
+
+@router.get("/users/{user_id}/roles", response_model=Page[AssignedRole])
+async def list_user_roles(user_id: UUID, cursor: Cursor = None, limit: Limit = DEFAULT_PAGE_SIZE):
+    return await page_response(listing.user_roles(user_id), cursor, limit)
+
+
+@router.get("/users/{user_id}/roles/export")
+async def export_user_roles(user_id: UUID):
+    return export_response(listing.user_roles(user_id))
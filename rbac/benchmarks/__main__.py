@@ -0,0 +1,139 @@
+"""Load test the RBAC service.
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks --users 10000 --concurrency 32
+
+By default everything runs in this process: the app is served over an
+in-memory ASGI transport, backed by sqlite (aiosqlite) and fakeredis, so no
+services are needed. Set DATABASE_URL to a local postgres to benchmark that
+instead, or pass --url to load an already running instance over HTTP.
+
+Each read endpoint gets a cold phase (every request is a user nobody has
+asked about yet, so it misses both cache layers) followed by a warm phase
+over the same users.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+os.environ.setdefault("REDIS_URL", "fakeredis://")
+
+import httpx  # noqa: E402
+
+from benchmarks.dataset import Dataset, DatasetSpec, seed  # noqa: E402
+from benchmarks.load import PhaseResult, report, run_phase  # noqa: E402
+
+
+def _parse_args() -> argparse.Namespace:
+    spec = DatasetSpec()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--url", help="benchmark a running server instead of an in-process app")
+    parser.add_argument("--users", type=int, default=spec.users)
+    parser.add_argument("--roles", type=int, default=spec.roles)
+    parser.add_argument("--permissions", type=int, default=spec.permissions)
+    parser.add_argument("--roles-per-user", type=int, default=spec.roles_per_user)
+    parser.add_argument("--permissions-per-role", type=int, default=spec.permissions_per_role)
+    parser.add_argument("--fanout", choices=["uniform", "zipf"], default=spec.fanout)
+    parser.add_argument("--zipf-s", type=float, default=spec.zipf_s)
+    parser.add_argument("--seed", type=int, default=spec.seed)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per phase")
+    parser.add_argument("--concurrency", type=int, default=32)
+    return parser.parse_args()
+
+
+def _phases(data: Dataset, args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    users = data.user_ids[:]
+    rng.shuffle(users)
+
+    # disjoint users per endpoint so each cold phase really starts cold
+    third = len(users) // 3
+    check_users = users[:third]
+    listing_users = users[third:2 * third]
+    write_users = users[2 * third:]
+    cold = min(args.requests, third)
+
+    def permission_for(user_id: str) -> str:
+        held = data.assignments[user_id]
+        if held and rng.random() < 0.5:
+            return rng.choice(data.grants[rng.choice(held)])
+        return rng.choice(data.permissions)
+
+    checks = [(u, permission_for(u)) for u in check_users[:cold]]
+
+    def check(client, i):
+        user_id, permission = checks[i % len(checks)]
+        return client.get("/check", params={"user_id": user_id, "permission": permission})
+
+    def user_permissions(client, i):
+        return client.get(f"/users/{listing_users[i % cold]}/permissions")
+
+    tag = rng.randrange(16 ** 6)
+
+    def create_user(client, i):
+        return client.post("/users", json={"username": f"bench-{tag:06x}-new-{i}"})
+
+    def assign_role(client, i):
+        return client.post("/assign-role", json={
+            "user_id": rng.choice(write_users),
+            "role_id": rng.choice(data.role_ids),
+        })
+
+    return [
+        ("GET /check (cold)", check, cold),
+        ("GET /check (warm)", check, args.requests),
+        ("GET /users/{id}/permissions (cold)", user_permissions, cold),
+        ("GET /users/{id}/permissions (warm)", user_permissions, args.requests),
+        ("POST /users", create_user, args.requests),
+        ("POST /assign-role", assign_role, args.requests),
+    ]
+
+
+async def _run(client: httpx.AsyncClient, args: argparse.Namespace) -> list[PhaseResult]:
+    spec = DatasetSpec(
+        users=args.users,
+        roles=args.roles,
+        permissions=args.permissions,
+        roles_per_user=args.roles_per_user,
+        permissions_per_role=args.permissions_per_role,
+        fanout=args.fanout,
+        zipf_s=args.zipf_s,
+        seed=args.seed,
+    )
+    start = time.perf_counter()
+    data = await seed(client, spec)
+    print(
+        f"seeded {spec.users:,} users, {spec.roles:,} roles, {spec.permissions:,} permissions "
+        f"({spec.fanout} fanout) in {time.perf_counter() - start:.1f}s"
+    )
+
+    results = []
+    for name, request, count in _phases(data, args):
+        results.append(await run_phase(client, name, request, count, args.concurrency))
+    return results
+
+
+async def main() -> None:
+    args = _parse_args()
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+            results = await _run(client, args)
+    else:
+        from main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                results = await _run(client, args)
+
+    print()
+    report(results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Synthetic RBAC datasets, seeded through the /bulk endpoints."""
+import json
+import random
+from dataclasses import dataclass, field
+
+import httpx
+
+NDJSON = {"content-type": "application/x-ndjson"}
+# rows per bulk request; the server chunks transactions on its own
+UPLOAD_BATCH = 5000
+
+
+@dataclass
+class DatasetSpec:
+    users: int = 10_000
+    roles: int = 100
+    permissions: int = 500
+    roles_per_user: int = 3
+    permissions_per_role: int = 20
+    # how roles are picked for each user: "uniform", or "zipf" so a few
+    # roles are held by most users (the realistic case for invalidation)
+    fanout: str = "zipf"
+    zipf_s: float = 1.1
+    seed: int = 1
+
+
+@dataclass
+class Dataset:
+    user_ids: list[str] = field(default_factory=list)
+    role_ids: list[str] = field(default_factory=list)
+    permissions: list[str] = field(default_factory=list)
+    grants: dict[str, list[str]] = field(default_factory=dict)
+    assignments: dict[str, list[str]] = field(default_factory=dict)
+
+
+def _role_weights(spec: DatasetSpec) -> list[float] | None:
+    if spec.fanout == "uniform":
+        return None
+    if spec.fanout == "zipf":
+        return [1 / (rank ** spec.zipf_s) for rank in range(1, spec.roles + 1)]
+    raise ValueError(f"unknown fanout distribution: {spec.fanout}")
+
+
+def _pick(rng: random.Random, population: list, k: int, weights) -> list:
+    k = min(k, len(population))
+    if weights is None:
+        return rng.sample(population, k)
+    picked: dict = {}
+    while len(picked) < k:
+        picked[rng.choices(population, weights)[0]] = None
+    return list(picked)
+
+
+async def _upload(client: httpx.AsyncClient, path: str, rows: list[str]) -> list[dict]:
+    results = []
+    for start in range(0, len(rows), UPLOAD_BATCH):
+        body = "\n".join(rows[start:start + UPLOAD_BATCH])
+        response = await client.post(path, content=body, headers=NDJSON)
+        response.raise_for_status()
+        results.extend(response.json()["results"])
+    return results
+
+
+def _rows(**columns) -> list[str]:
+    names = list(columns)
+    return [json.dumps(dict(zip(names, values))) for values in zip(*columns.values())]
+
+
+async def seed(client: httpx.AsyncClient, spec: DatasetSpec) -> Dataset:
+    rng = random.Random(spec.seed)
+    data = Dataset()
+    tag = rng.randrange(16 ** 6)
+
+    users = await _upload(client, "/bulk/users", _rows(
+        username=[f"bench-{tag:06x}-user-{i}" for i in range(spec.users)],
+    ))
+    roles = await _upload(client, "/bulk/roles", _rows(
+        name=[f"bench-{tag:06x}-role-{i}" for i in range(spec.roles)],
+    ))
+    data.user_ids = [row["id"] for row in users]
+    data.role_ids = [row["id"] for row in roles]
+    data.permissions = [
+        f"module{i // 10}:action{i % 10}" for i in range(spec.permissions)
+    ]
+
+    grant_pairs = []
+    for role_id in data.role_ids:
+        granted = rng.sample(data.permissions, min(spec.permissions_per_role, spec.permissions))
+        data.grants[role_id] = granted
+        grant_pairs.extend((role_id, permission) for permission in granted)
+    await _upload(client, "/bulk/assign-permission", _rows(
+        role_id=[role_id for role_id, _ in grant_pairs],
+        permission=[permission for _, permission in grant_pairs],
+    ))
+
+    weights = _role_weights(spec)
+    assignment_pairs = []
+    for user_id in data.user_ids:
+        held = _pick(rng, data.role_ids, spec.roles_per_user, weights)
+        data.assignments[user_id] = held
+        assignment_pairs.extend((user_id, role_id) for role_id in held)
+    await _upload(client, "/bulk/assign-role", _rows(
+        user_id=[user_id for user_id, _ in assignment_pairs],
+        role_id=[role_id for _, role_id in assignment_pairs],
+    ))
+
+    return data
@@ -0,0 +1,69 @@
+"""Fixed-concurrency load phases and latency reporting."""
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import httpx
+
+# a request factory gets the request number and returns the response
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+# statuses that are a normal answer for a write workload (e.g. duplicate assignment)
+EXPECTED_STATUSES = {200, 201, 409}
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    requests: int
+    errors: int
+    elapsed: float
+    latencies: list[float]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: int) -> float:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=100)[p - 1]
+
+
+async def run_phase(
+    client: httpx.AsyncClient,
+    name: str,
+    request: Request,
+    requests: int,
+    concurrency: int,
+) -> PhaseResult:
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in EXPECTED_STATUSES:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return PhaseResult(name, requests, errors, elapsed, latencies)
+
+
+def report(results: list[PhaseResult]) -> None:
+    header = f"{'phase':<34}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.name:<34}{r.requests:>8}{r.errors:>8}{r.throughput:>10.0f}"
+            f"{r.percentile(50) * 1e3:>9.2f}{r.percentile(95) * 1e3:>9.2f}{r.percentile(99) * 1e3:>9.2f}"
+        )
@@ -0,0 +1,58 @@
+"""Per-request cost of the db session middleware on cache-hit traffic.
+
+Compares the old middleware (an AsyncSession opened for every request)
+against the lazy one, with a handler that never touches the database - the
+shape of a `/check` answered from the in-process cache.
+
+    python -m benchmarks.session_overhead [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
+
+from api.deps import db_session_middleware  # noqa: E402
+from core.database import async_session, db_session, engine  # noqa: E402
+
+
+async def eager_session_middleware(request, call_next):
+    async with async_session() as session:
+        token = db_session.set(session)
+        try:
+            response = await call_next(request)
+        finally:
+            db_session.reset(token)
+        return response
+
+
+async def cache_hit(request):
+    return {"has_permission": True}
+
+
+async def measure(middleware, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        await middleware(None, cache_hit)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int) -> None:
+    # warm up imports, pools and caches before timing anything
+    await measure(eager_session_middleware, 1000)
+    await measure(db_session_middleware, 1000)
+
+    eager = await measure(eager_session_middleware, requests)
+    lazy = await measure(db_session_middleware, requests)
+    await engine.dispose()
+
+    print(f"requests:        {requests:,}")
+    print(f"eager session:   {eager * 1e6:8.2f} us/request")
+    print(f"lazy session:    {lazy * 1e6:8.2f} us/request")
+    print(f"saved:           {(eager - lazy) * 1e6:8.2f} us/request ({1 - lazy / eager:.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,108 @@
+"""Index size and permission-join latency for the current schema.
+
+    python -m benchmarks.storage --reset --users 20000
+
+Seeds a dataset like `python -m benchmarks`, then reports the on-disk size
+of every RBAC table and index (pg_relation_size on postgres, dbstat on
+sqlite) and the latency of the two cache-miss queries: the full
+user_roles -> role_closure -> role_permissions -> permissions join, and the
+primary-key lookup on user_effective_permissions. Run it on two schema
+versions to compare them. --reset drops and recreates all tables first.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///bench.db")
+os.environ.setdefault("REDIS_URL", "fakeredis://")
+
+import httpx  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+
+from benchmarks.dataset import DatasetSpec, seed  # noqa: E402
+
+SIZES = {
+    "postgresql": """
+        SELECT c.relname, c.relkind = 'i', pg_relation_size(c.oid)
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relkind IN ('r', 'i')
+    """,
+    "sqlite": """
+        SELECT name, name IN (SELECT name FROM sqlite_schema WHERE type = 'index'), SUM(pgsize)
+        FROM dbstat WHERE name NOT LIKE 'sqlite_schema' GROUP BY name
+    """,
+}
+
+
+def _percentiles(samples: list[float]) -> str:
+    q = statistics.quantiles(samples, n=100)
+    return f"p50 {q[49] * 1e3:7.3f} ms   p99 {q[98] * 1e3:7.3f} ms"
+
+
+async def _time_queries(session, stmt_for, user_ids, samples: int) -> list[float]:
+    latencies = []
+    for user_id in random.Random(0).choices(user_ids, k=samples):
+        start = time.perf_counter()
+        (await session.execute(stmt_for(user_id))).all()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.storage")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--roles", type=int, default=200)
+    parser.add_argument("--permissions", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    from core.database import async_session, engine, init_db
+    from main import app
+    from models.user_effective_permission import UserEffectivePermission
+    from models.user_role import UserRole
+    from services.effective_permissions import derived
+
+    if args.reset:
+        await init_db(reset=True)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            data = await seed(client, DatasetSpec(
+                users=args.users, roles=args.roles, permissions=args.permissions,
+            ))
+
+        dialect = engine.dialect.name
+        async with async_session() as session:
+            if dialect == "postgresql":
+                await session.execute(text("ANALYZE"))
+            rows = (await session.execute(text(SIZES[dialect]))).all()
+
+            tables = sum(size for _, is_index, size in rows if not is_index)
+            indexes = sum(size for _, is_index, size in rows if is_index)
+            print(f"{dialect}: {args.users:,} users, {args.roles:,} roles, {args.permissions:,} permissions")
+            for name, is_index, size in sorted(rows, key=lambda r: -r[2]):
+                print(f"  {'index' if is_index else 'table'} {name:<45} {size / 1024:>10.0f} KiB")
+            print(f"  tables total {tables / 1024:.0f} KiB, indexes total {indexes / 1024:.0f} KiB")
+
+            user_ids = [UserRole.user_id.type.python_type(u) for u in data.user_ids]
+            join = await _time_queries(
+                session, lambda u: derived().where(UserRole.user_id == u), user_ids, args.samples
+            )
+            lookup = await _time_queries(
+                session,
+                lambda u: select(UserEffectivePermission.permission_id)
+                .where(UserEffectivePermission.user_id == u),
+                user_ids,
+                args.samples,
+            )
+            print(f"permission join      {_percentiles(join)}")
+            print(f"effective pk lookup  {_percentiles(lookup)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
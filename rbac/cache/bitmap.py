@@ -0,0 +1,41 @@
+"""Permission bitmaps.
+
+In process a bitmap is a plain int where bit `i` means "has permission id i".
+In Redis it is a string laid out so that `GETBIT key i` reads the same bit.
+Bit 0 is never a permission (ids start at 1); it is always set so a cached
+empty bitmap can be told apart from a missing key.
+"""
+from typing import Iterable, Iterator
+
+PRESENT_BIT = 0
+EMPTY = 1 << PRESENT_BIT
+
+# redis numbers bits from the most significant bit of each byte
+_REVERSED = bytes(int(f"{b:08b}"[::-1], 2) for b in range(256))
+
+
+def from_ids(ids: Iterable[int]) -> int:
+    bits = EMPTY
+    for i in ids:
+        bits |= 1 << i
+    return bits
+
+
+def has(bits: int, i: int) -> bool:
+    return bool(bits >> i & 1)
+
+
+def iter_ids(bits: int) -> Iterator[int]:
+    bits &= ~EMPTY
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def to_redis(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little").translate(_REVERSED)
+
+
+def from_redis(data: bytes) -> int:
+    return int.from_bytes(data.translate(_REVERSED), "little")
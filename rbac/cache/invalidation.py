@@ -0,0 +1,118 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+from uuid import UUID
+
+from cache.local_cache import permission_cache
+from cache.redis_client import redis
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "perms:invalidate"
+RECONNECT_DELAY = 1.0
+# keys per DEL / ids per pub/sub message, so huge roles don't build giant commands
+INVALIDATION_CHUNK = 1000
+
+# set while the listener is subscribed, so other instances' evictions reach this one
+listening = asyncio.Event()
+# open eviction watches (see watch_evictions)
+_watches: list["EvictionWatch"] = []
+# users invalidated within the last REPLICA_LAG_WINDOW seconds, oldest first
+_recent: OrderedDict[UUID, float] = OrderedDict()
+
+
+class EvictionWatch:
+    """Users invalidated while the watch is open, as seen by this instance."""
+
+    def __init__(self):
+        self.users: set[UUID] = set()
+        # the pub/sub connection dropped; evictions may have been missed
+        self.lost = False
+
+
+@contextmanager
+def watch_evictions() -> Iterator[EvictionWatch]:
+    """Collect invalidations, from this instance's outbox worker and from pub/sub, while open."""
+    watch = EvictionWatch()
+    _watches.append(watch)
+    try:
+        yield watch
+    finally:
+        _watches.remove(watch)
+
+
+def recently_invalidated(user_id: UUID) -> bool:
+    """Whether `user_id` was invalidated recently enough that a replica may not have the write yet."""
+    invalidated_at = _recent.get(user_id)
+    return invalidated_at is not None and time.monotonic() - invalidated_at <= settings.REPLICA_LAG_WINDOW
+
+
+def _evicted(user_ids) -> None:
+    for watch in _watches:
+        watch.users.update(user_ids)
+
+    now = time.monotonic()
+    for user_id in user_ids:
+        _recent[user_id] = now
+        _recent.move_to_end(user_id)
+    cutoff = now - settings.REPLICA_LAG_WINDOW
+    while _recent and next(iter(_recent.values())) < cutoff:
+        _recent.popitem(last=False)
+
+
+def _lost() -> None:
+    for watch in _watches:
+        watch.lost = True
+
+
+def cache_key(user_id: UUID) -> str:
+    return f"perms:{user_id}"
+
+
+async def invalidate_users(*user_ids: UUID) -> None:
+    """Drop cached permissions for `user_ids` here, in Redis, and on every other instance."""
+    if not user_ids:
+        return
+
+    _evicted(user_ids)
+    permission_cache.invalidate(*user_ids)
+    async with redis.pipeline(transaction=False) as pipe:
+        for start in range(0, len(user_ids), INVALIDATION_CHUNK):
+            chunk = user_ids[start:start + INVALIDATION_CHUNK]
+            pipe.delete(*(cache_key(user_id) for user_id in chunk))
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps([str(user_id) for user_id in chunk]))
+        await pipe.execute()
+
+
+def _apply(message: str) -> None:
+    user_ids = [UUID(user_id) for user_id in json.loads(message)]
+    _evicted(user_ids)
+    permission_cache.invalidate(*user_ids)
+
+
+async def listen_for_invalidations() -> None:
+    """Keep the local cache coherent with writes made by other app instances."""
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # anything published while we were disconnected is lost
+                permission_cache.clear()
+                listening.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        _apply(message["data"])
+        except asyncio.CancelledError:
+            listening.clear()
+            raise
+        except Exception:
+            logger.exception("invalidation listener disconnected, retrying")
+            listening.clear()
+            permission_cache.clear()
+            _lost()
+            await asyncio.sleep(RECONNECT_DELAY)
@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from core.config import settings
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with a per-entry TTL.
+
+    Sits in front of Redis so hot keys never leave the process. Entries are
+    dropped on TTL expiry, LRU eviction or explicit invalidation (which also
+    bumps `generation`, so a load that raced an invalidation can be discarded).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None, ttl: float | None = None) -> None:
+        """Store `value`; `ttl` can shorten (never extend) this entry's lifetime."""
+        if self.maxsize <= 0:
+            return
+        # an invalidation landed while the value was being loaded
+        if generation is not None and generation != self.generation:
+            return
+
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._data.clear()
+
+    def keys(self) -> list[str]:
+        """Cached keys, most recently used first."""
+        return list(reversed(self._data))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+permission_cache = LocalCache(settings.L1_CACHE_SIZE, settings.L1_CACHE_TTL)
@@ -2,4 +2,13 @@ from redis import asyncio as aioredis
 
 from core.config import settings
 
-redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+FAKE_REDIS_SCHEME = "fakeredis://"
+
+if settings.REDIS_URL.startswith(FAKE_REDIS_SCHEME):
+    # in-process stand-in for local runs and benchmarks (pip install fakeredis)
+    from fakeredis import FakeAsyncRedis
+
+    redis = FakeAsyncRedis()
+else:
+    # binary-safe: cached permissions are raw bitmaps
+    redis = aioredis.from_url(settings.REDIS_URL)
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent loads of the same key into one call.
+
+    The first caller for a key runs the loader; everyone else arriving while it
+    is in flight awaits the same result instead of hitting the backend again.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[T]]) -> T:
+        while (call := self._calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # the leader was cancelled, not us - take over the load
+                if not call.cancelled():
+                    raise
+
+        call = asyncio.get_running_loop().create_future()
+        # nobody may be waiting on it; don't warn about unretrieved errors
+        call.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = call
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as exc:
+            call.set_exception(exc)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
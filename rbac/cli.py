@@ -0,0 +1,79 @@
+"""Maintenance commands.
+
+    python cli.py rebuild-effective-permissions
+    python cli.py verify-effective-permissions
+    python cli.py export-snapshot --out policy.snap
+    python cli.py export-snapshot --out policy.delta --base policy.snap [--base older.delta ...]
+"""
+import argparse
+import asyncio
+import sys
+
+from cache.redis_client import redis
+from core.database import db_session, engine, session_scope
+from services import effective_permissions, outbox
+from snapshot.export import export_snapshot
+
+
+async def rebuild_effective_permissions(args: argparse.Namespace) -> int:
+    async with session_scope():
+        stale = await effective_permissions.out_of_sync_users()
+        rows = await effective_permissions.rebuild()
+        # the running app instances' outbox workers evict the stale users
+        outbox.record("effective_permissions.rebuilt", {"rows": rows}, stale)
+        await db_session.get().commit()
+    print(f"rebuilt user_effective_permissions: {rows} rows, {len(stale)} users were out of sync")
+    return 0
+
+
+async def verify_effective_permissions(args: argparse.Namespace) -> int:
+    async with session_scope():
+        stale = await effective_permissions.out_of_sync_users()
+    if not stale:
+        print("user_effective_permissions is in sync")
+        return 0
+    print(f"{len(stale)} users out of sync, run rebuild-effective-permissions:")
+    for user_id in sorted(stale)[:args.show]:
+        print(f"  {user_id}")
+    return 1
+
+
+async def export_snapshot_command(args: argparse.Namespace) -> int:
+    if not args.out:
+        print("export-snapshot needs --out")
+        return 2
+    header = await export_snapshot(args.out, args.base)
+    kind = f"delta on top of {header.base_version}" if header.is_delta else "snapshot"
+    print(
+        f"wrote {kind} {header.version} to {args.out}: {header.n_users} users,"
+        f" {header.n_bitmaps} distinct permission sets, {header.n_names} permission ids"
+    )
+    return 0
+
+
+COMMANDS = {
+    "rebuild-effective-permissions": rebuild_effective_permissions,
+    "verify-effective-permissions": verify_effective_permissions,
+    "export-snapshot": export_snapshot_command,
+}
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog="python cli.py")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--show", type=int, default=20, help="out-of-sync users to list")
+    parser.add_argument("--out", help="export-snapshot: file to write")
+    parser.add_argument(
+        "--base", action="append", default=[],
+        help="export-snapshot: write a delta on top of this snapshot (then its deltas, in order)",
+    )
+    args = parser.parse_args()
+    try:
+        return await COMMANDS[args.command](args)
+    finally:
+        await redis.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,3 @@
+from .client import RBACClient
+
+__all__ = ["RBACClient"]
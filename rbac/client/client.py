@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Iterable
+from uuid import UUID
+
+import httpx
+
+# server-side cap on checks per POST /check/batch (schemas.permission.MAX_BATCH_CHECKS)
+MAX_BATCH_CHECKS = 500
+
+Check = tuple[str, str]
+
+
+class RBACClient:
+    """Async client for the RBAC API.
+
+    Every `can()` made in the same event-loop tick is answered by one
+    `POST /check/batch` (the flush is scheduled with `call_soon`, so it
+    runs once the callers that are already runnable have queued their
+    checks, DataLoader-style). A request handler that fans out a few
+    dozen permission checks with `asyncio.gather` costs one round trip.
+    Identical checks in flight share one slot in the batch.
+
+    Decisions are kept for `cache_ttl` seconds (`cache_size` most recent
+    ones), so a revocation can take that long to show up here; 0
+    disables the cache. Requests go over one pooled keep-alive
+    connection set.
+
+        async with RBACClient("http://rbac:8000") as rbac:
+            if await rbac.can(user_id, "wallet:read"):
+                ...
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        cache_ttl: float = 1.0,
+        cache_size: int = 10_000,
+        max_connections: int = 20,
+        timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._decisions: OrderedDict[Check, tuple[float, bool]] = OrderedDict()
+        self._queued: dict[Check, asyncio.Future[bool]] = {}
+        self._flush_scheduled = False
+        self._batches: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "RBACClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        await self._http.aclose()
+
+    async def can(self, user_id: UUID | str, permission: str) -> bool:
+        check = (str(user_id), permission)
+        cached = self._cached(check)
+        if cached is not None:
+            return cached
+
+        future = self._queued.get(check)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._queued[check] = loop.create_future()
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                loop.call_soon(self._flush)
+        # shielded: one cancelled caller mustn't cancel the others waiting on this check
+        return await asyncio.shield(future)
+
+    async def can_many(self, checks: Iterable[tuple[UUID | str, str]]) -> list[bool]:
+        return list(await asyncio.gather(*(self.can(user_id, p) for user_id, p in checks)))
+
+    async def permissions(self, user_id: UUID | str) -> list[str]:
+        response = await self._http.get(f"/users/{user_id}/permissions")
+        response.raise_for_status()
+        return response.json()["permissions"]
+
+    def clear_cache(self) -> None:
+        self._decisions.clear()
+
+    def _cached(self, check: Check) -> bool | None:
+        entry = self._decisions.get(check)
+        if entry is None:
+            return None
+        expires_at, allowed = entry
+        if expires_at < time.monotonic():
+            del self._decisions[check]
+            return None
+        self._decisions.move_to_end(check)
+        return allowed
+
+    def _remember(self, checks: list[Check], results: list[bool]) -> None:
+        if self.cache_ttl <= 0:
+            return
+        expires_at = time.monotonic() + self.cache_ttl
+        for check, allowed in zip(checks, results):
+            self._decisions[check] = (expires_at, allowed)
+            self._decisions.move_to_end(check)
+        while len(self._decisions) > self.cache_size:
+            self._decisions.popitem(last=False)
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        queued, self._queued = self._queued, {}
+        checks = list(queued)
+        for start in range(0, len(checks), MAX_BATCH_CHECKS):
+            batch = {check: queued[check] for check in checks[start:start + MAX_BATCH_CHECKS]}
+            task = asyncio.create_task(self._send(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _send(self, batch: dict[Check, asyncio.Future[bool]]) -> None:
+        checks = list(batch)
+        try:
+            response = await self._http.post("/check/batch", json={
+                "checks": [{"user_id": user_id, "permission": p} for user_id, p in checks],
+            })
+            response.raise_for_status()
+            results = response.json()["results"]
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._remember(checks, results)
+        for future, allowed in zip(batch.values(), results):
+            if not future.done():
+                future.set_result(allowed)
@@ -1,5 +1,8 @@
-from contextvars import ContextVar
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
 
+import orjson
+from sqlalchemy import make_url
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -8,9 +11,99 @@ from sqlalchemy.ext.asyncio import (
 
 from core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL)
+
+def _create_engine(url: str):
+    url = make_url(url)
+    kwargs = {}
+    # sqlite (local runs, benchmarks) picks its own pool class
+    if url.get_backend_name() != "sqlite":
+        kwargs.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    # JSON columns (outbox payloads) hold UUIDs and datetimes, which orjson encodes natively
+    return create_async_engine(url, json_serializer=lambda value: orjson.dumps(value).decode(), **kwargs)
+
+
+engine = _create_engine(settings.DATABASE_URL)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-db_session: ContextVar[AsyncSession] = ContextVar("db_session")
+
+if settings.DATABASE_REPLICA_URL:
+    read_engine = _create_engine(settings.DATABASE_REPLICA_URL)
+    async_read_session = async_sessionmaker(
+        read_engine, class_=AsyncSession, expire_on_commit=False
+    )
+else:
+    read_engine = engine
+    async_read_session = async_session
+
+
+class LazySession:
+    """Per-context AsyncSession that is only created on first `get()`.
+
+    `set()` with no argument opens a scope (the middleware does this per
+    request); requests answered from cache never construct a session at
+    all. A session passed to `set()` explicitly is used as is and left for
+    the caller to close.
+    """
+
+    class _Slot:
+        __slots__ = ("session", "owned")
+
+        def __init__(self, session: AsyncSession | None):
+            self.session = session
+            self.owned = session is None
+
+    def __init__(self, name: str, factory: async_sessionmaker):
+        self._var: ContextVar[LazySession._Slot] = ContextVar(name)
+        self._factory = factory
+
+    def set(self, session: AsyncSession | None = None) -> Token:
+        return self._var.set(self._Slot(session))
+
+    def reset(self, token: Token) -> None:
+        self._var.reset(token)
+
+    def get(self) -> AsyncSession:
+        slot = self._var.get()
+        if slot.session is None:
+            slot.session = self._factory()
+        return slot.session
+
+    async def close(self) -> None:
+        slot = self._var.get(None)
+        if slot is not None and slot.owned and slot.session is not None:
+            await slot.session.close()
+            slot.session = None
+
+
+db_session = LazySession("db_session", async_session)
+# read-only queries that tolerate replication lag; same session without a replica
+db_read_session = (
+    LazySession("db_read_session", async_read_session)
+    if read_engine is not engine
+    else db_session
+)
+
+
+@asynccontextmanager
+async def session_scope():
+    """Open (lazy) primary and replica session scopes for one unit of work."""
+    scopes = [db_session] if db_read_session is db_session else [db_session, db_read_session]
+    tokens = [(scope, scope.set()) for scope in scopes]
+    try:
+        yield
+    finally:
+        for scope, token in reversed(tokens):
+            await scope.close()
+            scope.reset(token)
+
 
 async def init_db(reset: bool = False):
     from models.base import Base
@@ -19,3 +112,12 @@ async def init_db(reset: bool = False):
         if reset:
             await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+
+
+def insert_ignore(model):
+    """INSERT ... ON CONFLICT DO NOTHING for whichever backend we're on."""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model).on_conflict_do_nothing()
@@ -1,24 +1,60 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from api.deps import db_session_middleware
-from api.routes import permissions, roles, users
+from api.deps import MetricsMiddleware, db_session_middleware
+from api.routes import bulk, metrics, permissions, roles, users
+from cache.invalidation import listen_for_invalidations
 from cache.redis_client import redis
-from core.database import engine, init_db
+from core.config import settings
+from core.database import engine, init_db, read_engine, session_scope
+from services.cache_warmup import save_hot_users, warm_cache
+from services.change_feed import sink
+from services.outbox import run_outbox_worker
+from services.permission_service import backfill
+from services.role_expiry import run_expiry_scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    async with session_scope():
+        await backfill()
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    outbox_worker = asyncio.create_task(run_outbox_worker(sink))
+    expiry_scheduler = asyncio.create_task(run_expiry_scheduler())
+
+    warmup = None
+    if settings.CACHE_WARMUP:
+        warmup = asyncio.create_task(warm_cache())
+        # don't hold readiness hostage; whatever is left keeps going in the background
+        await asyncio.wait({warmup}, timeout=settings.CACHE_WARMUP_BUDGET)
     yield
+    background = [
+        task for task in (warmup, expiry_scheduler, outbox_worker, invalidation_listener)
+        if task is not None
+    ]
+    for task in background:
+        task.cancel()
+    # let them unwind (close their sessions, finish a drain's cleanup) while
+    # the sink, redis and the engines they use are still open
+    await asyncio.gather(*background, return_exceptions=True)
+    await save_hot_users()
+    await sink.close()
     await redis.aclose()
     await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
 app.middleware("http")(db_session_middleware)
+# added last so it wraps everything, session handling included
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(roles.router)
 app.include_router(permissions.router)
+app.include_router(bulk.router)
+app.include_router(metrics.router)
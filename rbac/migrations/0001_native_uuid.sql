@@ -0,0 +1,54 @@
+-- Convert id / foreign-key columns from varchar to native uuid (16 bytes
+-- instead of 37 per value, in every table and index that carries one).
+-- Run once against an existing postgres database, with the app stopped:
+--
+--     psql "$DATABASE_URL" -f migrations/0001_native_uuid.sql
+--
+-- Fresh databases created by init_db() already use uuid columns.
+
+BEGIN;
+
+ALTER TABLE user_roles DROP CONSTRAINT user_roles_user_id_fkey;
+ALTER TABLE user_roles DROP CONSTRAINT user_roles_role_id_fkey;
+ALTER TABLE role_permissions DROP CONSTRAINT role_permissions_role_id_fkey;
+ALTER TABLE role_inheritance DROP CONSTRAINT role_inheritance_parent_id_fkey;
+ALTER TABLE role_inheritance DROP CONSTRAINT role_inheritance_child_id_fkey;
+ALTER TABLE role_closure DROP CONSTRAINT role_closure_ancestor_id_fkey;
+ALTER TABLE role_closure DROP CONSTRAINT role_closure_descendant_id_fkey;
+ALTER TABLE user_effective_permissions DROP CONSTRAINT user_effective_permissions_user_id_fkey;
+
+ALTER TABLE users ALTER COLUMN id TYPE uuid USING id::uuid;
+ALTER TABLE roles ALTER COLUMN id TYPE uuid USING id::uuid;
+ALTER TABLE user_roles
+    ALTER COLUMN user_id TYPE uuid USING user_id::uuid,
+    ALTER COLUMN role_id TYPE uuid USING role_id::uuid;
+ALTER TABLE role_permissions
+    ALTER COLUMN id TYPE uuid USING id::uuid,
+    ALTER COLUMN role_id TYPE uuid USING role_id::uuid;
+ALTER TABLE role_inheritance
+    ALTER COLUMN parent_id TYPE uuid USING parent_id::uuid,
+    ALTER COLUMN child_id TYPE uuid USING child_id::uuid;
+ALTER TABLE role_closure
+    ALTER COLUMN ancestor_id TYPE uuid USING ancestor_id::uuid,
+    ALTER COLUMN descendant_id TYPE uuid USING descendant_id::uuid;
+ALTER TABLE user_effective_permissions
+    ALTER COLUMN user_id TYPE uuid USING user_id::uuid;
+
+ALTER TABLE user_roles
+    ADD CONSTRAINT user_roles_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+    ADD CONSTRAINT user_roles_role_id_fkey FOREIGN KEY (role_id) REFERENCES roles (id) ON DELETE CASCADE;
+ALTER TABLE role_permissions
+    ADD CONSTRAINT role_permissions_role_id_fkey FOREIGN KEY (role_id) REFERENCES roles (id) ON DELETE CASCADE;
+ALTER TABLE role_inheritance
+    ADD CONSTRAINT role_inheritance_parent_id_fkey FOREIGN KEY (parent_id) REFERENCES roles (id) ON DELETE CASCADE,
+    ADD CONSTRAINT role_inheritance_child_id_fkey FOREIGN KEY (child_id) REFERENCES roles (id) ON DELETE CASCADE;
+ALTER TABLE role_closure
+    ADD CONSTRAINT role_closure_ancestor_id_fkey FOREIGN KEY (ancestor_id) REFERENCES roles (id) ON DELETE CASCADE,
+    ADD CONSTRAINT role_closure_descendant_id_fkey FOREIGN KEY (descendant_id) REFERENCES roles (id) ON DELETE CASCADE;
+ALTER TABLE user_effective_permissions
+    ADD CONSTRAINT user_effective_permissions_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE;
+
+-- rewritten tables: refresh planner statistics
+ANALYZE users, roles, user_roles, role_permissions, role_inheritance, role_closure, user_effective_permissions;
+
+COMMIT;
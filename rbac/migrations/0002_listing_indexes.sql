@@ -0,0 +1,15 @@
+-- Indexes for the keyset-paginated listings (role members, grants of a
+-- permission). The new user_roles index has role_id as its prefix, so it
+-- also replaces the old single-column one.
+--
+--     psql "$DATABASE_URL" -f migrations/0002_listing_indexes.sql
+--
+-- CONCURRENTLY can't run inside a transaction block; each statement is
+-- its own transaction and writes keep flowing while they build.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_roles_role_id_created_at
+    ON user_roles (role_id, created_at, user_id);
+DROP INDEX CONCURRENTLY IF EXISTS ix_user_roles_role_id;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_role_permissions_permission_created_at
+    ON role_permissions (permission, created_at, id);
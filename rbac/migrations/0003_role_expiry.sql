@@ -0,0 +1,13 @@
+-- Optional expiry on role assignments, and the partial index the expiry
+-- scheduler reads (earliest expires_at, rows past it). Adding a nullable
+-- column without a default is a catalog-only change.
+--
+--     psql "$DATABASE_URL" -f migrations/0003_role_expiry.sql
+--
+-- CONCURRENTLY can't run inside a transaction block; each statement is
+-- its own transaction and writes keep flowing while the index builds.
+
+ALTER TABLE user_roles ADD COLUMN IF NOT EXISTS expires_at timestamptz;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_user_roles_expires_at
+    ON user_roles (expires_at) WHERE expires_at IS NOT NULL;
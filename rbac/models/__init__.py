@@ -2,4 +2,9 @@ from .base import Base
 from .user import User
 from .role import Role
 from .user_role import UserRole
-from .role_permission import RolePermission
\ No newline at end of file
+from .role_permission import RolePermission
+from .permission import Permission
+from .role_inheritance import RoleInheritance
+from .role_closure import RoleClosure
+from .user_effective_permission import UserEffectivePermission
+from .outbox_event import OutboxEvent
@@ -1,4 +1,11 @@
+from sqlalchemy import DateTime
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import DeclarativeBase
 
+# sqlite's CURRENT_TIMESTAMP has whole seconds; bind parameters in the same
+# format, otherwise comparing against server-defaulted rows goes wrong
+Timestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
+
 class Base(DeclarativeBase):
-    pass
\ No newline at end of file
+    pass
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, Timestamp
+
+class OutboxEvent(Base):
+    """A change event, committed in the same transaction as the write it describes.
+
+    `users` are the users whose cached permissions the write affected;
+    services/outbox.py invalidates them and publishes the event.
+    """
+    __tablename__ = "outbox"
+
+    # sqlite only autoincrements INTEGER PRIMARY KEY
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    event: Mapped[str] = mapped_column(String(50))
+    payload: Mapped[dict] = mapped_column(JSON)
+    users: Mapped[list] = mapped_column(JSON)
+
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp, server_default=func.now()
+    )
+
+    # event ids must never be reused after rows are drained; consumers dedupe on them
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -0,0 +1,15 @@
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class Permission(Base):
+    """Interned permission names.
+
+    Gives every permission string a small integer id so effective
+    permissions can be cached as bitmaps (bit `id` set = permission granted).
+    """
+    __tablename__ = "permissions"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
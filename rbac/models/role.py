@@ -1,18 +1,18 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, func
+from sqlalchemy import String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, Timestamp
 
 class Role(Base):
     __tablename__ = "roles"
 
-    id: Mapped[str] = mapped_column(
-        primary_key=True, default= lambda: str(uuid.uuid4())
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True, default=uuid.uuid4
     )
     name: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        Timestamp, server_default=func.now()
     )
     
\ No newline at end of file
@@ -0,0 +1,19 @@
+import uuid
+
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class RoleClosure(Base):
+    """Transitive closure of `role_inheritance`, one row per (ancestor, descendant).
+
+    Every role is its own ancestor, so resolving a user's permissions is a
+    single join no matter how deep the hierarchy goes.
+    """
+    __tablename__ = "role_closure"
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (Index("ix_role_closure_descendant_id", "descendant_id"),)
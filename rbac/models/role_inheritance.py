@@ -0,0 +1,17 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import func, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, Timestamp
+
+class RoleInheritance(Base):
+    """Direct parent -> child edge; the child inherits the parent's permissions."""
+    __tablename__ = "role_inheritance"
+
+    parent_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    child_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        Timestamp, server_default=func.now()
+    )
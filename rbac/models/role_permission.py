@@ -1,21 +1,25 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, func, ForeignKey, UniqueConstraint
+from sqlalchemy import String, func, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, Timestamp
 
 class RolePermission(Base):
     __tablename__ = "role_permissions"
 
-    id: Mapped[str] = mapped_column(primary_key=True, default=lambda: str(uuid.uuid4()))
-    role_id: Mapped[str] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"))
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    role_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"))
     permission: Mapped[str] = mapped_column(String(100))
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        Timestamp, server_default=func.now()
     )
 
     # to prevent the same permission to be set for the same role
-    __table_args__ = (UniqueConstraint("role_id", "permission", name="uq_role_permission"),)
+    __table_args__ = (
+        UniqueConstraint("role_id", "permission", name="uq_role_permission"),
+        # listing the grants of a permission, in (created_at, id) order
+        Index("ix_role_permissions_permission_created_at", "permission", "created_at", "id"),
+    )
     
\ No newline at end of file
@@ -0,0 +1,17 @@
+import uuid
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+class UserEffectivePermission(Base):
+    """Materialized user -> permission expansion of roles, inheritance and grants.
+
+    Maintained in the same transaction as every write that changes it, so a
+    cache miss is a primary-key range scan instead of the four-way join.
+    """
+    __tablename__ = "user_effective_permissions"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    permission_id: Mapped[int] = mapped_column(ForeignKey("permissions.id", ondelete="CASCADE"), primary_key=True)
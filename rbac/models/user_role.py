@@ -1,17 +1,33 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, func, PrimaryKeyConstraint, ForeignKey
+from sqlalchemy import String, func, PrimaryKeyConstraint, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, Timestamp
 
 class UserRole(Base):
     __tablename__ = "user_roles"
 
-    user_id: Mapped[str] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
-    role_id: Mapped[str] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    role_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now()
+        Timestamp, server_default=func.now()
+    )
+    # time-bound assignments are revoked at this time (services/role_expiry.py)
+    expires_at: Mapped[datetime | None] = mapped_column(Timestamp, nullable=True)
+
+    # the primary key only covers lookups by user_id; invalidation on a
+    # permission grant needs every user holding a role, and listing a
+    # role's members pages through them in (created_at, user_id) order.
+    # The expiry scheduler only ever asks for the earliest expires_at and
+    # the rows past it, so that index leaves out permanent assignments
+    __table_args__ = (
+        Index("ix_user_roles_role_id_created_at", "role_id", "created_at", "user_id"),
+        Index(
+            "ix_user_roles_expires_at",
+            "expires_at",
+            postgresql_where=text("expires_at IS NOT NULL"),
+            sqlite_where=text("expires_at IS NOT NULL"),
+        ),
     )
-    
\ No newline at end of file
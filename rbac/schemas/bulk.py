@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class BulkRowResult(BaseModel):
+    status: str
+    id: UUID | None = None
+
+
+class BulkResponse(BaseModel):
+    created: int
+    conflicts: int
+    not_found: int
+    results: list[BulkRowResult]
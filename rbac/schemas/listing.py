@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Generic, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # pass back as ?cursor= for the next page; null on the last one
+    next_cursor: str | None = None
+
+
+class RoleMember(BaseModel):
+    user_id: UUID
+    username: str
+    assigned_at: datetime
+    expires_at: datetime | None = None
+
+
+class AssignedRole(BaseModel):
+    role_id: UUID
+    name: str
+    assigned_at: datetime
+    expires_at: datetime | None = None
+
+
+class PermissionGrant(BaseModel):
+    id: UUID
+    role_id: UUID
+    role_name: str
+    granted_at: datetime
@@ -1,6 +1,18 @@
-from pydantic import BaseModel
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+MAX_BATCH_CHECKS = 500
 
 
 class CheckPermissionRequest(BaseModel):
-    user_id: str
+    user_id: UUID
     permission: str
+
+
+class BatchCheckRequest(BaseModel):
+    checks: list[CheckPermissionRequest] = Field(max_length=MAX_BATCH_CHECKS)
+
+
+class BatchCheckResponse(BaseModel):
+    results: list[bool]
@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from uuid import UUID
+
+from pydantic import AwareDatetime, BaseModel, field_validator
 
 
 class CreateRoleRequest(BaseModel):
@@ -6,15 +9,31 @@ class CreateRoleRequest(BaseModel):
 
 
 class RoleResponse(BaseModel):
-    id: str
+    id: UUID
     name: str
 
 
 class AssignRoleRequest(BaseModel):
-    user_id: str
-    role_id: str
+    user_id: UUID
+    role_id: UUID
+    # the assignment is revoked at this time; omit for a permanent one
+    expires_at: AwareDatetime | None = None
+
+    @field_validator("expires_at")
+    @classmethod
+    def _in_the_future(cls, value: datetime | None) -> datetime | None:
+        if value is None:
+            return None
+        value = value.astimezone(timezone.utc)
+        if value <= datetime.now(timezone.utc):
+            raise ValueError("expires_at must be in the future")
+        return value
 
 
 class AssignPermissionRequest(BaseModel):
-    role_id: str
+    role_id: UUID
     permission: str
+
+
+class AddRoleParentRequest(BaseModel):
+    parent_id: UUID
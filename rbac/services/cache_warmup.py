@@ -0,0 +1,177 @@
+"""Preload permission bitmaps into redis after a deploy or a flush.
+
+On shutdown each instance records its most recently used users (the front
+of the in-process LRU); on startup those are warmed first, then everyone
+else is streamed from `user_effective_permissions` through a server-side
+cursor, ordered by user so each user's rows arrive together. Entries are
+written with SET NX in pipelined batches, so live traffic that got there
+first always wins. Users holding a time-bound role are left to load on
+demand, which caps their entry's TTL at the role's expiry.
+
+SET NX doesn't help once the outbox has evicted a user: the key is gone
+and the streamed bitmap may predate the write. Evictions are watched for
+the whole warm-up (they all reach this instance, through its own worker
+or pub/sub); evicted users are skipped, and any written before their
+eviction arrived are deleted again.
+"""
+import asyncio
+import logging
+import time
+from uuid import UUID
+
+from sqlalchemy import select
+
+from cache import bitmap
+from cache.invalidation import INVALIDATION_CHUNK, EvictionWatch, cache_key, listening, watch_evictions
+from cache.local_cache import permission_cache
+from cache.redis_client import redis
+from core.config import settings
+from core.database import async_read_session
+from models.user_effective_permission import UserEffectivePermission
+from models.user_role import UserRole
+from services.permission_service import _cache_ttl, _has_replica
+
+logger = logging.getLogger(__name__)
+
+HOT_USERS_KEY = "perms:hot_users"
+HOT_USERS_TTL = 24 * 3600
+# how long after the last write warm-up keeps watching for evictions that were in flight
+EVICTION_GRACE = 1.0
+
+
+class EvictionsMissed(Exception):
+    """The invalidation listener dropped during warm-up."""
+
+
+async def save_hot_users() -> None:
+    users = permission_cache.keys()[: settings.CACHE_WARMUP_LIMIT or None]
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(HOT_USERS_KEY)
+        if users:
+            pipe.rpush(HOT_USERS_KEY, *map(str, users))
+            pipe.expire(HOT_USERS_KEY, HOT_USERS_TTL)
+        await pipe.execute()
+
+
+class _Progress:
+    def __init__(self):
+        self.users = 0
+        self.started = time.monotonic()
+
+    def log(self, phase: str) -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.users / elapsed if elapsed else 0.0
+        logger.info("cache warm-up (%s): %d users in %.1fs (%.0f/s)", phase, self.users, elapsed, rate)
+
+
+async def _write(batch: dict[UUID, int], into_local: bool, generation: int, watch: EvictionWatch) -> set[UUID]:
+    """Write the users not evicted since warm-up began; returns those written."""
+    if watch.lost:
+        raise EvictionsMissed
+    batch = {user_id: bits for user_id, bits in batch.items() if user_id not in watch.users}
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id, bits in batch.items():
+            # read through async_read_session, so capped like any other replica read
+            ttl = _cache_ttl(bits, from_replica=_has_replica)
+            pipe.set(cache_key(user_id), bitmap.to_redis(bits), ex=ttl, nx=True)
+        await pipe.execute()
+    # evicted while the SETs were in flight: their DEL may have landed first
+    await _delete([user_id for user_id in batch if user_id in watch.users])
+    if into_local:
+        for user_id, bits in batch.items():
+            permission_cache.set(user_id, bits, generation)
+    return set(batch)
+
+
+async def _delete(user_ids) -> None:
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), INVALIDATION_CHUNK):
+        await redis.delete(*(cache_key(user_id) for user_id in user_ids[start:start + INVALIDATION_CHUNK]))
+
+
+async def _stream(
+    session,
+    stmt,
+    limit: int | None,
+    skip: set[UUID],
+    into_local: bool,
+    watch: EvictionWatch,
+    progress: _Progress,
+    phase: str,
+) -> set[UUID]:
+    """Group consecutive rows per user into bitmaps and flush them in batches."""
+    # an invalidation after this point may be newer than the rows read below
+    generation = permission_cache.generation
+    result = await session.stream(
+        stmt.order_by(UserEffectivePermission.user_id)
+        .execution_options(yield_per=settings.CACHE_WARMUP_BATCH * 8)
+    )
+    warmed: set[UUID] = set()
+    batch: dict[UUID, int] = {}
+    async for user_id, permission_id in result:
+        if user_id in skip:
+            continue
+        if user_id not in batch:
+            if limit is not None and progress.users + len(batch) >= limit:
+                break
+            if len(batch) >= settings.CACHE_WARMUP_BATCH:
+                warmed |= await _write(batch, into_local, generation, watch)
+                progress.users += len(batch)
+                progress.log(phase)
+                batch = {}
+            batch[user_id] = bitmap.EMPTY
+        batch[user_id] |= 1 << permission_id
+    await result.close()
+
+    if batch:
+        warmed |= await _write(batch, into_local, generation, watch)
+        progress.users += len(batch)
+    return warmed
+
+
+async def warm_cache() -> None:
+    try:
+        await _warm_cache()
+    except EvictionsMissed:
+        logger.warning("cache warm-up stopped: invalidations may have been missed while it ran")
+    except Exception:
+        # a failed warm-up only costs cold misses; never take the app down
+        logger.exception("cache warm-up failed")
+
+
+async def _warm_cache() -> None:
+    limit = settings.CACHE_WARMUP_LIMIT
+    progress = _Progress()
+    rows = select(UserEffectivePermission.user_id, UserEffectivePermission.permission_id).where(
+        UserEffectivePermission.user_id.not_in(
+            select(UserRole.user_id).where(UserRole.expires_at.is_not(None))
+        )
+    )
+
+    hot = [UUID(user_id.decode()) for user_id in await redis.lrange(HOT_USERS_KEY, 0, -1)]
+    warmed: set[UUID] = set()
+    # evictions by other instances only reach us once subscribed
+    await listening.wait()
+    with watch_evictions() as watch:
+        try:
+            async with async_read_session() as session:
+                for start in range(0, len(hot), settings.CACHE_WARMUP_BATCH):
+                    chunk = hot[start:start + settings.CACHE_WARMUP_BATCH]
+                    warmed |= await _stream(
+                        session, rows.where(UserEffectivePermission.user_id.in_(chunk)),
+                        limit, warmed, True, watch, progress, "hot users",
+                    )
+                progress.log("hot users")
+
+                if limit is None or progress.users < limit:
+                    warmed |= await _stream(session, rows, limit, warmed, False, watch, progress, "all users")
+            await asyncio.sleep(EVICTION_GRACE)
+            if watch.lost:
+                raise EvictionsMissed
+        except EvictionsMissed:
+            # can't tell which of ours are stale; a cold miss is cheaper than a wrong answer
+            await _delete(warmed)
+            raise
+        finally:
+            await _delete(warmed & watch.users)
+    progress.log("done")
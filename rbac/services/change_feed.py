@@ -0,0 +1,101 @@
+"""Sinks for the change events drained from the outbox.
+
+`sink` is picked from CHANGE_FEED_URL: `memory://` keeps recent events in
+process (local runs, tests), an amqp:// URL publishes to RabbitMQ. Both
+take a batch at a time; `publish` returning means the batch is delivered,
+so the outbox rows can go.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol
+
+import orjson
+import pika
+
+from core.config import settings
+
+MEMORY_SCHEME = "memory://"
+
+
+class ChangeSink(Protocol):
+    async def publish(self, events: list[dict]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class InMemorySink:
+    """Keeps the last `maxlen` events."""
+
+    def __init__(self, maxlen: int = 10_000):
+        self.events: deque[dict] = deque(maxlen=maxlen)
+
+    async def publish(self, events: list[dict]) -> None:
+        self.events.extend(events)
+
+    async def close(self) -> None:
+        pass
+
+
+class RabbitMQSink:
+    """Publishes each event to a durable topic exchange, routed by event name.
+
+    pika's BlockingConnection is neither async nor thread safe, so all of
+    its calls run on one dedicated thread. Publisher confirms are on:
+    `publish` only returns once the broker has taken every message, and
+    a broken connection is dropped and reopened on the next batch.
+    """
+
+    def __init__(self, url: str, exchange: str):
+        self._parameters = pika.URLParameters(url)
+        self._exchange = exchange
+        self._connection = None
+        self._channel = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="change-feed")
+
+    def _connect(self) -> None:
+        self._connection = pika.BlockingConnection(self._parameters)
+        self._channel = self._connection.channel()
+        self._channel.exchange_declare(exchange=self._exchange, exchange_type="topic", durable=True)
+        self._channel.confirm_delivery()
+
+    def _publish(self, events: list[dict]) -> None:
+        try:
+            if self._channel is None or self._channel.is_closed:
+                self._connect()
+            for event in events:
+                self._channel.basic_publish(
+                    exchange=self._exchange,
+                    routing_key=event["event"],
+                    body=orjson.dumps(event),
+                    properties=pika.BasicProperties(
+                        content_type="application/json",
+                        delivery_mode=pika.DeliveryMode.Persistent,
+                        # delivery is at least once; consumers dedupe on this
+                        message_id=str(event["id"]),
+                    ),
+                )
+        except pika.exceptions.AMQPError:
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        if self._connection is not None and self._connection.is_open:
+            try:
+                self._connection.close()
+            except pika.exceptions.AMQPError:
+                pass
+        self._connection = self._channel = None
+
+    async def publish(self, events: list[dict]) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._publish, events)
+
+    async def close(self) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._disconnect)
+        self._executor.shutdown()
+
+
+if settings.CHANGE_FEED_URL.startswith(MEMORY_SCHEME):
+    sink: ChangeSink = InMemorySink()
+else:
+    sink = RabbitMQSink(settings.CHANGE_FEED_URL, settings.CHANGE_FEED_EXCHANGE)
@@ -0,0 +1,108 @@
+"""Maintenance of the `user_effective_permissions` table.
+
+The table is a cache of `derived()`: user_roles (those not expired) ->
+role_closure -> role_permissions -> permissions. Grants only ever add rows, so they insert
+just the derived rows they could have created; anything that can take a
+permission away recomputes the affected users. All functions run inside
+the caller's transaction and return the users whose rows changed (or may
+have), for cache invalidation after commit.
+"""
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import delete, or_, select, true, tuple_
+
+from core.database import db_session, insert_ignore
+from models.permission import Permission
+from models.role_closure import RoleClosure
+from models.role_permission import RolePermission
+from models.user_effective_permission import UserEffectivePermission
+from models.user_role import UserRole
+
+COLUMNS = ["user_id", "permission_id"]
+
+
+def derived():
+    """(user_id, permission_id) rows as they follow from the source tables."""
+    return (
+        select(UserRole.user_id, Permission.id)
+        .select_from(UserRole)
+        .join(RoleClosure, RoleClosure.descendant_id == UserRole.role_id)
+        .join(RolePermission, RolePermission.role_id == RoleClosure.ancestor_id)
+        .join(Permission, Permission.name == RolePermission.permission)
+        .where(or_(UserRole.expires_at.is_(None), UserRole.expires_at > datetime.now(timezone.utc)))
+        .distinct()
+    )
+
+
+async def _insert(stmt) -> set[UUID]:
+    session = db_session.get()
+    result = await session.execute(
+        insert_ignore(UserEffectivePermission)
+        .from_select(COLUMNS, stmt)
+        .returning(UserEffectivePermission.user_id)
+    )
+    return set(result.scalars())
+
+
+async def add_users(user_ids) -> set[UUID]:
+    """After roles were given to `user_ids` (or their roles gained ancestors)."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+    return await _insert(derived().where(UserRole.user_id.in_(user_ids)))
+
+
+async def add_grants(grants) -> set[UUID]:
+    """After (role_id, permission) grants were inserted."""
+    grants = list(grants)
+    if not grants:
+        return set()
+    return await _insert(
+        derived().where(tuple_(RolePermission.role_id, RolePermission.permission).in_(grants))
+    )
+
+
+async def refresh_users(user_ids) -> set[UUID]:
+    """Recompute `user_ids` from scratch, for changes that can revoke."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    session = db_session.get()
+    await session.execute(
+        delete(UserEffectivePermission).where(UserEffectivePermission.user_id.in_(user_ids))
+    )
+    await _insert(derived().where(UserRole.user_id.in_(user_ids)))
+    return user_ids
+
+
+async def rebuild() -> int:
+    """Throw the table away and recompute it in one INSERT ... SELECT."""
+    session = db_session.get()
+    await session.execute(delete(UserEffectivePermission))
+    result = await session.execute(
+        insert_ignore(UserEffectivePermission).from_select(
+            COLUMNS,
+            # the WHERE keeps sqlite from parsing ON CONFLICT as a join clause
+            derived().where(true()),
+        )
+    )
+    return result.rowcount
+
+
+async def out_of_sync_users() -> set[UUID]:
+    """Users whose stored rows differ from `derived()` in either direction."""
+    session = db_session.get()
+    stored = select(UserEffectivePermission.user_id, UserEffectivePermission.permission_id)
+    missing = derived().except_(stored).subquery()
+    extra = stored.except_(derived()).subquery()
+    result = await session.execute(
+        select(missing.c.user_id).union(select(extra.c.user_id))
+    )
+    return set(result.scalars())
+
+
+async def is_empty() -> bool:
+    session = db_session.get()
+    row = await session.scalar(select(UserEffectivePermission.user_id).limit(1))
+    return row is None
@@ -0,0 +1,130 @@
+"""Keyset-paginated and streamed listings of role assignments and grants.
+
+Pages are ordered by (created_at, id) and resume strictly after the last
+row of the previous page, so every page is an index range scan however
+deep it is, in a stable order with no row on two pages. A row committed
+in the meantime with a key behind the cursor (a long transaction's
+created_at) is not seen. Exports run the same queries through a server-side cursor and
+hand rows back a batch at a time, so memory stays flat however many
+rows there are.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple
+from uuid import UUID
+
+import orjson
+from sqlalchemy import Select, literal, select, tuple_
+
+from core.database import async_read_session, db_read_session
+from models.role import Role
+from models.role_permission import RolePermission
+from models.user import User
+from models.user_role import UserRole
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class Listing(NamedTuple):
+    stmt: Select
+    # (created_at, id) columns to order and resume by ...
+    key: tuple
+    # ... and the names they are selected under
+    key_fields: tuple[str, str]
+
+
+def role_members(role_id: UUID) -> Listing:
+    return Listing(
+        select(
+            UserRole.user_id,
+            User.username,
+            UserRole.created_at.label("assigned_at"),
+            UserRole.expires_at,
+        )
+        .join(User, User.id == UserRole.user_id)
+        .where(UserRole.role_id == role_id),
+        (UserRole.created_at, UserRole.user_id),
+        ("assigned_at", "user_id"),
+    )
+
+
+def user_roles(user_id: UUID) -> Listing:
+    return Listing(
+        select(
+            UserRole.role_id,
+            Role.name,
+            UserRole.created_at.label("assigned_at"),
+            UserRole.expires_at,
+        )
+        .join(Role, Role.id == UserRole.role_id)
+        .where(UserRole.user_id == user_id),
+        (UserRole.created_at, UserRole.role_id),
+        ("assigned_at", "role_id"),
+    )
+
+
+def permission_grants(permission: str) -> Listing:
+    """Roles granted exactly `permission` (wildcard grants that cover it aren't expanded)."""
+    return Listing(
+        select(
+            RolePermission.id,
+            RolePermission.role_id,
+            Role.name.label("role_name"),
+            RolePermission.created_at.label("granted_at"),
+        )
+        .join(Role, Role.id == RolePermission.role_id)
+        .where(RolePermission.permission == permission),
+        (RolePermission.created_at, RolePermission.id),
+        ("granted_at", "id"),
+    )
+
+
+def _encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = orjson.dumps([created_at.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = orjson.loads(raw)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise InvalidCursor("malformed cursor")
+
+
+async def page(listing: Listing, cursor: str | None, limit: int) -> tuple[list[dict], str | None]:
+    """Up to `limit` rows after `cursor`, plus the cursor of the next page (None on the last one)."""
+    stmt = listing.stmt.order_by(*listing.key).limit(limit + 1)
+    if cursor is not None:
+        after = (literal(value, column.type) for column, value in zip(listing.key, _decode_cursor(cursor)))
+        stmt = stmt.where(tuple_(*listing.key) > tuple_(*after))
+
+    session = db_read_session.get()
+    rows = [dict(row._mapping) for row in await session.execute(stmt)]
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    created_at, row_id = (rows[-1][field] for field in listing.key_fields)
+    return rows, _encode_cursor(created_at, row_id)
+
+
+async def stream(listing: Listing) -> AsyncIterator[list[dict]]:
+    """Every row of `listing`, in batches of STREAM_BATCH.
+
+    Opens its own session: a streamed response body is sent after the
+    request's session scope has already closed.
+    """
+    async with async_read_session() as session:
+        result = await session.stream(
+            listing.stmt.order_by(*listing.key).execution_options(yield_per=STREAM_BATCH)
+        )
+        async for rows in result.mappings().partitions():
+            yield [dict(row) for row in rows]
@@ -0,0 +1,131 @@
+"""Transactional outbox for RBAC writes.
+
+Every mutation records an `outbox` row in its own transaction, naming
+the change and the users whose cached permissions it touched, so the
+event commits or rolls back together with the write. Writes never wait
+on redis or the broker: `run_outbox_worker` drains the table in batches
+(invalidate the affected users, publish the events, delete the rows)
+and a failure anywhere leaves the rows for the next attempt. Delivery
+is therefore at least once; consumers dedupe on the event id.
+
+Every app instance runs a worker. On postgres a batch is claimed with
+FOR UPDATE SKIP LOCKED so instances don't process the same rows, which
+also means events from different batches can be published out of order.
+"""
+import asyncio
+import logging
+import time
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import delete, select
+
+from cache.invalidation import invalidate_users
+from cache.local_cache import permission_cache
+from core.config import settings
+from core.database import async_session, db_session
+from models.outbox_event import OutboxEvent
+from services.change_feed import ChangeSink
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 1.0
+# a pending user whose event another instance drained stops being pending after this
+PENDING_TIMEOUT = 10.0
+
+_wakeup = asyncio.Event()
+# users written through this instance whose redis entries the worker hasn't
+# evicted yet, with when they were written; reads for them skip the caches
+_pending: dict[UUID, float] = {}
+
+
+def record(event: str, payload: dict, users: Iterable[UUID] = ()) -> None:
+    """Add a change event to the current transaction."""
+    db_session.get().add(OutboxEvent(event=event, payload=payload, users=list(users)))
+
+
+def notify(users: Iterable[UUID] = ()) -> None:
+    """Call after commit: drop this instance's in-process copies now and wake the worker.
+
+    Until the worker has evicted them from redis the users stay pending,
+    so this instance still reads its own writes; redis and the other
+    instances catch up as soon as the event is drained.
+    """
+    users = list(users)
+    now = time.monotonic()
+    for user_id in users:
+        _pending[user_id] = now
+    permission_cache.invalidate(*users)
+    _wakeup.set()
+
+
+def is_pending(user_id: UUID) -> bool:
+    written_at = _pending.get(user_id)
+    if written_at is None:
+        return False
+    if time.monotonic() - written_at > PENDING_TIMEOUT:
+        _pending.pop(user_id, None)
+        return False
+    return True
+
+
+def _settle(users: set[UUID], claimed_at: float) -> None:
+    # users written again after the batch was claimed wait for their own event
+    for user_id in users:
+        if _pending.get(user_id, claimed_at) <= claimed_at:
+            _pending.pop(user_id, None)
+
+
+def _expire_pending() -> None:
+    cutoff = time.monotonic() - PENDING_TIMEOUT
+    for user_id in [u for u, written_at in _pending.items() if written_at < cutoff]:
+        del _pending[user_id]
+
+
+def _message(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "event": event.event,
+        "payload": event.payload,
+        "users": event.users,
+        "created_at": event.created_at,
+    }
+
+
+async def drain(sink: ChangeSink) -> int:
+    """Process one batch of outbox rows; returns how many there were."""
+    claimed_at = time.monotonic()
+    async with async_session() as session:
+        events = list(await session.scalars(
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id)
+            .limit(settings.OUTBOX_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        ))
+        if not events:
+            return 0
+
+        users = {UUID(user_id) for event in events for user_id in event.users}
+        await invalidate_users(*users)
+        _settle(users, claimed_at)
+        await sink.publish([_message(event) for event in events])
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([e.id for e in events])))
+        await session.commit()
+    return len(events)
+
+
+async def run_outbox_worker(sink: ChangeSink) -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            drained = await drain(sink)
+        except Exception:
+            logger.exception("outbox drain failed, retrying in %.0fs", RETRY_DELAY)
+            await asyncio.sleep(RETRY_DELAY)
+            continue
+        if drained < settings.OUTBOX_BATCH_SIZE:
+            _expire_pending()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.OUTBOX_POLL_INTERVAL)
+            except TimeoutError:
+                pass
@@ -0,0 +1,114 @@
+import time
+from typing import Iterable
+
+import orjson
+from sqlalchemy import select
+
+from cache import bitmap
+from cache.single_flight import SingleFlight
+from core.database import db_read_session
+from models.permission import Permission
+from services.permission_matcher import PermissionMatcher, is_wildcard
+
+# how often a lookup for an unknown name may reload the table
+REFRESH_INTERVAL = 1.0
+# distinct wildcard-grant combinations to keep compiled matchers for
+MAX_MATCHERS = 4096
+# distinct permission sets to keep pre-encoded JSON for
+MAX_ENCODED = 4096
+
+
+class PermissionIndex:
+    """Process-local copy of the `permissions` table (name <-> interned id).
+
+    Ids never change once assigned, so entries are learned from permission
+    queries as they pass by and only unknown names/ids trigger a reload.
+    Reloads for unknown names are rate limited so a flood of checks for
+    permissions nobody was ever granted can't turn into a query per check.
+
+    Also compiles wildcard grants into matchers. Users holding the same set
+    of wildcard grants (i.e. the same roles) share one matcher, keyed by
+    that subset of their bitmap. The same goes for the sorted, JSON-encoded
+    name list served by the permissions endpoint: it only depends on the
+    bitmap, so it is encoded once per distinct permission set.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._known = bitmap.EMPTY
+        self._wildcards = 0
+        self._matchers: dict[int, PermissionMatcher] = {}
+        self._encoded: dict[int, bytes] = {}
+        self._refreshed_at = float("-inf")
+        self._refresh = SingleFlight()
+
+    def learn(self, permission_id: int, name: str) -> None:
+        self._ids[name] = permission_id
+        self._names[permission_id] = name
+        self._known |= 1 << permission_id
+        if is_wildcard(name):
+            self._wildcards |= 1 << permission_id
+
+    async def ids_of(self, names: Iterable[str]) -> dict[str, int]:
+        names = set(names)
+        if not names <= self._ids.keys():
+            if time.monotonic() - self._refreshed_at >= REFRESH_INTERVAL:
+                await self._refresh.do("all", self._reload)
+        return {name: self._ids[name] for name in names if name in self._ids}
+
+    async def id_of(self, name: str) -> int | None:
+        return (await self.ids_of([name])).get(name)
+
+    async def id_in(self, name: str, bits: int) -> int | None:
+        """id_of for a name the rate limit may have hidden, when `bits` might hold it.
+
+        Unknown ids in a bitmap always reload, unknown names only once per
+        REFRESH_INTERVAL; going through the bitmap means a permission
+        granted since the last reload is still found for its holders.
+        """
+        await self._learn_bits(bits)
+        return self._ids.get(name)
+
+    async def names_of(self, bits: int) -> set[str]:
+        await self._learn_bits(bits)
+        return {self._names[i] for i in bitmap.iter_ids(bits) if i in self._names}
+
+    async def json_of(self, bits: int) -> bytes:
+        """The names in `bits` as a sorted JSON array."""
+        encoded = self._encoded.get(bits)
+        if encoded is None:
+            if len(self._encoded) >= MAX_ENCODED:
+                self._encoded.clear()
+            encoded = orjson.dumps(sorted(await self.names_of(bits)))
+            self._encoded[bits] = encoded
+        return encoded
+
+    async def matcher_for(self, bits: int) -> PermissionMatcher | None:
+        await self._learn_bits(bits)
+        wildcards = bits & self._wildcards
+        if not wildcards:
+            return None
+
+        matcher = self._matchers.get(wildcards)
+        if matcher is None:
+            if len(self._matchers) >= MAX_MATCHERS:
+                self._matchers.clear()
+            matcher = PermissionMatcher(self._names[i] for i in bitmap.iter_ids(wildcards))
+            self._matchers[wildcards] = matcher
+        return matcher
+
+    async def _learn_bits(self, bits: int) -> None:
+        if bits & ~self._known:
+            # a bitmap cached by another instance; the ids exist, go get them
+            await self._refresh.do("all", self._reload)
+
+    async def _reload(self) -> None:
+        session = db_read_session.get()
+        result = await session.execute(select(Permission.id, Permission.name))
+        for permission_id, name in result:
+            self.learn(permission_id, name)
+        self._refreshed_at = time.monotonic()
+
+
+permission_index = PermissionIndex()
@@ -0,0 +1,45 @@
+from typing import Iterable
+
+WILDCARD = "*"
+SEPARATOR = ":"
+
+_END = None  # marks the end of a grant; never a valid segment
+
+
+def is_wildcard(permission: str) -> bool:
+    return WILDCARD in permission
+
+
+class PermissionMatcher:
+    """Segment trie over wildcard grants like `post:*` or `billing:*:read`.
+
+    A `*` segment matches any single segment; a trailing `*` matches one or
+    more remaining segments, so `billing:*` covers `billing:invoice:read`.
+    Matching walks the trie once per segment, so the cost depends on the
+    length of the permission, not on how many grants were compiled in.
+    """
+
+    def __init__(self, grants: Iterable[str]):
+        self._root: dict = {}
+        for grant in grants:
+            node = self._root
+            for segment in grant.split(SEPARATOR):
+                node = node.setdefault(segment, {})
+            node[_END] = True
+
+    def matches(self, permission: str) -> bool:
+        return self._match(self._root, permission.split(SEPARATOR), 0)
+
+    def _match(self, node: dict, segments: list[str], i: int) -> bool:
+        if i == len(segments):
+            return _END in node
+
+        star = node.get(WILDCARD)
+        if star is not None:
+            if _END in star:
+                return True
+            if self._match(star, segments, i + 1):
+                return True
+
+        child = node.get(segments[i])
+        return child is not None and self._match(child, segments, i + 1)
@@ -1,21 +1,56 @@
-from sqlalchemy import select
+from datetime import datetime
+from typing import Iterable, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import cast, exists, func, null, select
 from sqlalchemy.exc import IntegrityError
 
+from cache import bitmap
+from cache.invalidation import cache_key, recently_invalidated
+from cache.local_cache import permission_cache
 from cache.redis_client import redis
-from core.database import db_session
+from cache.single_flight import SingleFlight
+from core import metrics
+from core.config import settings
+from core.database import db_read_session, db_session, insert_ignore
+from models.permission import Permission
 from models.role import Role
+from models.role_closure import RoleClosure
 from models.role_permission import RolePermission
 from models.user import User
+from models.user_effective_permission import UserEffectivePermission
 from models.user_role import UserRole
+from services import effective_permissions, outbox, role_expiry, role_hierarchy
+from services.permission_index import permission_index
+from services.role_hierarchy import RoleCycleError
 
 CACHE_TTL = 300
+# short-lived so floods of unknown ids don't pin memory in redis
+NEGATIVE_CACHE_TTL = 60
+
+# per-row outcomes of the bulk_* functions
+CREATED = "created"
+CONFLICT = "conflict"
+NOT_FOUND = "not_found"
+
+_loads = SingleFlight()
+# without a replica db_read_session is the primary session
+_has_replica = db_read_session is not db_session
+
+
+class RowResult(NamedTuple):
+    status: str
+    id: UUID | None = None
 
 
 async def create_user(username: str) -> User:
     session = db_session.get()
     user = User(username=username)
     session.add(user)
+    await session.flush()
+    outbox.record("user.created", {"user_id": user.id, "username": username})
     await session.commit()
+    outbox.notify()
     return user
 
 
@@ -23,63 +58,534 @@ async def create_role(rolename: str) -> Role:
     session = db_session.get()
     role = Role(name=rolename)
     session.add(role)
+    await session.flush()
+    await role_hierarchy.add_role(role.id)
+    outbox.record("role.created", {"role_id": role.id, "name": rolename})
     await session.commit()
+    outbox.notify()
     return role
 
 
-async def assign_role(user_id: str, role_id: str) -> bool:
+async def assign_role(user_id: UUID, role_id: UUID, expires_at: datetime | None = None) -> bool:
+    """Give `user_id` the role, until `expires_at` (a time in the future) if given."""
     session = db_session.get()
-    user_role = UserRole(user_id=user_id, role_id=role_id)
+    user_role = UserRole(user_id=user_id, role_id=role_id, expires_at=expires_at)
     session.add(user_role)
     try:
+        await session.flush()
+        changed = await effective_permissions.add_users([user_id])
+        outbox.record("role.assigned", {
+            "user_id": user_id, "role_id": role_id, "expires_at": expires_at,
+        }, changed)
         await session.commit()
-        await redis.delete(f"perms:{user_id}")
-        return True
     except IntegrityError:
         await session.rollback()
         return False
+    outbox.notify(changed)
+    if expires_at is not None:
+        role_expiry.schedule(expires_at)
+    return True
 
 
-async def assign_permission(role_id: str, permission: str) -> bool:
+async def assign_permission(role_id: UUID, permission: str) -> bool:
     session = db_session.get()
+    await _add_permissions([permission])
     role_permission = RolePermission(role_id=role_id, permission=permission)
     session.add(role_permission)
     try:
+        await session.flush()
+        # only users holding this role (or one inheriting it) can gain anything
+        changed = await effective_permissions.add_grants([(role_id, permission)])
+        outbox.record("permission.granted", {"role_id": role_id, "permission": permission}, changed)
         await session.commit()
-        # Invalidate all cached permissions (simplest approach)
-        async for key in redis.scan_iter("perms:*"):
-            await redis.delete(key)
-        return True
     except IntegrityError:
         await session.rollback()
         return False
+    outbox.notify(changed)
+    return True
 
 
-async def get_user_permission(user_id: str) -> set[str]:
-    cache_key = f"perms:{user_id}"
+async def add_role_parent(role_id: UUID, parent_id: UUID) -> bool:
+    session = db_session.get()
+    changed = set()
+    try:
+        created = await role_hierarchy.add_edge(parent_id, role_id)
+        if created:
+            changed = await effective_permissions.add_users(await _role_members(role_id))
+            outbox.record("role.parent_added", {"role_id": role_id, "parent_id": parent_id}, changed)
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        return False
+    except RoleCycleError:
+        await session.rollback()
+        raise
+    outbox.notify(changed)
+    return created
 
-    cached = await redis.smembers(cache_key)
-    if cached:
-        return set(cached)
 
+async def remove_role_parent(role_id: UUID, parent_id: UUID) -> bool:
     session = db_session.get()
+    removed = await role_hierarchy.remove_edge(parent_id, role_id)
+    changed = set()
+    if removed:
+        changed = await effective_permissions.refresh_users(await _role_members(role_id))
+        outbox.record("role.parent_removed", {"role_id": role_id, "parent_id": parent_id}, changed)
+    await session.commit()
+    outbox.notify(changed)
+    return removed
+
 
-    stmt = (
-        select(RolePermission.permission)
-        .join(UserRole, UserRole.role_id == RolePermission.role_id)
-        .where(UserRole.user_id == user_id)
+async def _role_members(*role_ids: UUID) -> list[UUID]:
+    session = db_session.get()
+    result = await session.execute(
+        select(UserRole.user_id)
+        .where(UserRole.role_id.in_(role_hierarchy.descendants_of(*role_ids)))
+        .distinct()
     )
+    return list(result.scalars())
+
+
+def _chunks(rows: list) -> Iterable[list]:
+    size = settings.BULK_CHUNK_SIZE
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def _existing_ids(model, ids: Iterable[UUID]) -> set[UUID]:
+    session = db_session.get()
+    result = await session.scalars(select(model.id).where(model.id.in_(set(ids))))
+    return set(result)
+
+
+async def _add_permissions(names: Iterable[str]) -> None:
+    """Intern permission names that don't have an id yet."""
+    session = db_session.get()
+    names = set(names)
+    names -= set(await session.scalars(select(Permission.name).where(Permission.name.in_(names))))
+    if names:
+        # only the missing names: postgres draws a sequence value for every
+        # proposed row, conflicting or not, and ids are bit positions
+        await session.execute(insert_ignore(Permission).values([{"name": name} for name in names]))
+
+
+async def bulk_create_users(usernames: list[str]) -> list[RowResult]:
+    """Create users a chunk per transaction; existing usernames come back as conflicts with their id."""
+    session = db_session.get()
+    results = []
+    for chunk in _chunks(usernames):
+        unique = list(dict.fromkeys(chunk))
+        inserted = await session.execute(
+            insert_ignore(User)
+            .values([{"username": username} for username in unique])
+            .returning(User.username, User.id)
+        )
+        created = dict(inserted.all())
+        existing = {}
+        if len(created) < len(unique):
+            rows = await session.execute(
+                select(User.username, User.id)
+                .where(User.username.in_([u for u in unique if u not in created]))
+            )
+            existing = dict(rows.all())
+        if created:
+            outbox.record("users.created", {
+                "created": [{"user_id": id, "username": name} for name, id in created.items()],
+            })
+        await session.commit()
+        outbox.notify()
+
+        for username in chunk:
+            if username in created:
+                results.append(RowResult(CREATED, created.pop(username)))
+                existing[username] = results[-1].id
+            else:
+                results.append(RowResult(CONFLICT, existing.get(username)))
+    return results
+
+
+async def bulk_create_roles(names: list[str]) -> list[RowResult]:
+    session = db_session.get()
+    results = []
+    for chunk in _chunks(names):
+        unique = list(dict.fromkeys(chunk))
+        inserted = await session.execute(
+            insert_ignore(Role)
+            .values([{"name": name} for name in unique])
+            .returning(Role.name, Role.id)
+        )
+        created = dict(inserted.all())
+        if created:
+            await session.execute(
+                insert_ignore(RoleClosure).values(
+                    [{"ancestor_id": id, "descendant_id": id} for id in created.values()]
+                )
+            )
+        existing = {}
+        if len(created) < len(unique):
+            rows = await session.execute(
+                select(Role.name, Role.id)
+                .where(Role.name.in_([n for n in unique if n not in created]))
+            )
+            existing = dict(rows.all())
+        if created:
+            outbox.record("roles.created", {
+                "created": [{"role_id": id, "name": name} for name, id in created.items()],
+            })
+        await session.commit()
+        outbox.notify()
+
+        for name in chunk:
+            if name in created:
+                results.append(RowResult(CREATED, created.pop(name)))
+                existing[name] = results[-1].id
+            else:
+                results.append(RowResult(CONFLICT, existing.get(name)))
+    return results
 
-    result = await session.execute(stmt)
-    permissions = {row[0] for row in result.fetchall()}
 
-    if permissions:
-        await redis.sadd(cache_key, *permissions)
-        await redis.expire(cache_key, CACHE_TTL)
+async def bulk_assign_roles(assignments: list[tuple[UUID, UUID, datetime | None]]) -> list[RowResult]:
+    """Assign (user_id, role_id, expires_at) rows, with one outbox event per chunk.
+
+    A pair listed twice is assigned once, with the first row's expiry.
+    """
+    session = db_session.get()
+    results = []
+    for chunk in _chunks(assignments):
+        users = await _existing_ids(User, (user_id for user_id, _, _ in chunk))
+        roles = await _existing_ids(Role, (role_id for _, role_id, _ in chunk))
+        valid: dict[tuple[UUID, UUID], datetime | None] = {}
+        for user_id, role_id, expires_at in chunk:
+            if user_id in users and role_id in roles:
+                valid.setdefault((user_id, role_id), expires_at)
+        created = set()
+        if valid:
+            inserted = await session.execute(
+                insert_ignore(UserRole)
+                .values([{"user_id": u, "role_id": r, "expires_at": e} for (u, r), e in valid.items()])
+                .returning(UserRole.user_id, UserRole.role_id)
+            )
+            created = set(inserted.all())
+        changed = set()
+        if created:
+            changed = await effective_permissions.add_users({u for u, _ in created})
+            outbox.record("roles.assigned", {
+                "assignments": [
+                    {"user_id": u, "role_id": r, "expires_at": valid[u, r]} for u, r in created
+                ],
+            }, changed)
+        await session.commit()
+        outbox.notify(changed)
+        expiries = [valid[pair] for pair in created if valid[pair] is not None]
+        if expiries:
+            role_expiry.schedule(min(expiries))
+
+        for user_id, role_id, _ in chunk:
+            if user_id not in users or role_id not in roles:
+                results.append(RowResult(NOT_FOUND))
+            elif (user_id, role_id) in created:
+                created.discard((user_id, role_id))
+                results.append(RowResult(CREATED))
+            else:
+                results.append(RowResult(CONFLICT))
+    return results
+
+
+async def bulk_assign_permissions(grants: list[tuple[UUID, str]]) -> list[RowResult]:
+    """Grant (role_id, permission) pairs, with one outbox event per chunk."""
+    session = db_session.get()
+    results = []
+    for chunk in _chunks(grants):
+        roles = await _existing_ids(Role, (role_id for role_id, _ in chunk))
+        valid = [pair for pair in dict.fromkeys(chunk) if pair[0] in roles]
+        created = set()
+        if valid:
+            await _add_permissions(p for _, p in valid)
+            inserted = await session.execute(
+                insert_ignore(RolePermission)
+                .values([{"role_id": r, "permission": p} for r, p in valid])
+                .returning(RolePermission.role_id, RolePermission.permission)
+            )
+            created = set(inserted.all())
+        changed = set()
+        if created:
+            changed = await effective_permissions.add_grants(created)
+            outbox.record("permissions.granted", {
+                "grants": [{"role_id": r, "permission": p} for r, p in created],
+            }, changed)
+        await session.commit()
+        outbox.notify(changed)
+
+        for role_id, permission in chunk:
+            if role_id not in roles:
+                results.append(RowResult(NOT_FOUND))
+            elif (role_id, permission) in created:
+                created.discard((role_id, permission))
+                results.append(RowResult(CREATED))
+            else:
+                results.append(RowResult(CONFLICT))
+    return results
 
-    return permissions
 
+async def backfill() -> None:
+    """Fill derived tables for rows written before those tables existed."""
+    session = db_session.get()
+    await role_hierarchy.backfill_closure()
+    await session.execute(
+        insert_ignore(Permission).from_select(
+            ["name"],
+            # the WHERE keeps sqlite from parsing ON CONFLICT as a join clause;
+            # the NOT EXISTS keeps postgres from drawing an id for every known name
+            select(RolePermission.permission)
+            .where(
+                RolePermission.permission.is_not(None),
+                ~exists().where(Permission.name == RolePermission.permission),
+            )
+            .distinct(),
+        )
+    )
+    if await effective_permissions.is_empty():
+        await effective_permissions.rebuild()
+    await session.commit()
 
-async def can(user_id: str, permission: str) -> bool:
-    user_permissions = await get_user_permission(user_id)
-    return permission in user_permissions
+
+async def get_user_permission(user_id: UUID) -> set[str]:
+    with metrics.RESOLVE_GET_USER_PERMISSION.time():
+        bits = await _get_user_bits(user_id)
+        return await permission_index.names_of(bits)
+
+
+async def get_user_permission_json(user_id: UUID) -> bytes:
+    """Like get_user_permission, as a sorted JSON array encoded once per distinct permission set."""
+    with metrics.RESOLVE_GET_USER_PERMISSION.time():
+        bits = await _get_user_bits(user_id)
+        return await permission_index.json_of(bits)
+
+
+async def _get_user_bits(user_id: UUID) -> int:
+    if outbox.is_pending(user_id):
+        # just written here and redis may still hold the old bitmap; a
+        # replica may not have the write yet either
+        bits, _ = await _query_bits([user_id], primary=True)
+        return bits[user_id]
+    local = permission_cache.get(user_id)
+    if local is not None:
+        return local
+
+    return await _loads.do(user_id, lambda: _load_user_bits(user_id))
+
+
+async def _load_user_bits(user_id: UUID) -> int:
+    generation = permission_cache.generation
+    key = cache_key(user_id)
+
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.pttl(key)
+        with metrics.REDIS_GET.time():
+            cached, pttl = await pipe.execute()
+    if cached:
+        metrics.REDIS_HIT.inc()
+        bits = bitmap.from_redis(cached)
+        ttl = _remaining(pttl)
+    else:
+        metrics.REDIS_MISS.inc()
+        ttl = None
+        loaded, expiries, from_replica = await _fill_bits([user_id])
+        bits, expires_at = loaded[user_id], expiries.get(user_id)
+        with metrics.REDIS_SET.time():
+            await redis.set(
+                key, bitmap.to_redis(bits), ex=_cache_ttl(bits, expires_at, user_id in from_replica)
+            )
+        if expires_at is not None:
+            ttl = _seconds_until(expires_at)
+
+    permission_cache.set(user_id, bits, generation, ttl)
+    return bits
+
+
+async def get_users_permissions(user_ids: Iterable[UUID]) -> dict[UUID, set[str]]:
+    bits = await _get_users_bits(user_ids)
+    return {
+        user_id: await permission_index.names_of(user_bits)
+        for user_id, user_bits in bits.items()
+    }
+
+
+async def _get_users_bits(user_ids: Iterable[UUID]) -> dict[UUID, int]:
+    """Resolve many users with at most one redis pipeline and one SQL query."""
+    found: dict[UUID, int] = {}
+    misses = []
+    pending = []
+    for user_id in dict.fromkeys(user_ids):
+        if outbox.is_pending(user_id):
+            pending.append(user_id)
+            continue
+        local = permission_cache.get(user_id)
+        if local is None:
+            misses.append(user_id)
+        else:
+            found[user_id] = local
+
+    if pending:
+        found.update((await _query_bits(pending, primary=True))[0])
+    if not misses:
+        return found
+
+    generation = permission_cache.generation
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for user_id in misses:
+            pipe.get(cache_key(user_id))
+            pipe.pttl(cache_key(user_id))
+        with metrics.REDIS_PIPELINE.time():
+            replies = await pipe.execute()
+
+    db_misses = []
+    for user_id, cached, pttl in zip(misses, replies[::2], replies[1::2]):
+        if cached:
+            found[user_id] = bitmap.from_redis(cached)
+            permission_cache.set(user_id, found[user_id], generation, _remaining(pttl))
+        else:
+            db_misses.append(user_id)
+    metrics.REDIS_HIT.inc(len(misses) - len(db_misses))
+    metrics.REDIS_MISS.inc(len(db_misses))
+
+    if db_misses:
+        loaded, expiries, from_replica = await _fill_bits(db_misses)
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, bits in loaded.items():
+                ttl = _cache_ttl(bits, expiries.get(user_id), user_id in from_replica)
+                pipe.set(cache_key(user_id), bitmap.to_redis(bits), ex=ttl)
+            with metrics.REDIS_PIPELINE.time():
+                await pipe.execute()
+        for user_id, bits in loaded.items():
+            expires_at = expiries.get(user_id)
+            ttl = _seconds_until(expires_at) if expires_at is not None else None
+            permission_cache.set(user_id, bits, generation, ttl)
+        found.update(loaded)
+
+    return found
+
+
+def _with_expiries(rows, user_ids, after: datetime | None = None):
+    """`rows` (user_id, permission_id) plus a (user_id, NULL, earliest expires_at)
+    row for each of `user_ids` with a time-bound role (expiring after `after`)."""
+    earliest = (
+        select(UserRole.user_id, null(), func.min(UserRole.expires_at))
+        .where(UserRole.user_id.in_(user_ids), UserRole.expires_at.is_not(None))
+        .group_by(UserRole.user_id)
+    )
+    if after is not None:
+        earliest = earliest.where(UserRole.expires_at > after)
+    return rows.add_columns(cast(null(), UserRole.expires_at.type)).union_all(earliest)
+
+
+async def _query_bits(
+    user_ids: list[UUID], primary: bool = False
+) -> tuple[dict[UUID, int], dict[UUID, datetime]]:
+    """Bitmaps of `user_ids`, and when the first of their time-bound roles expires (if any do).
+
+    One round trip, unless a role has expired and not been revoked yet.
+    Reads the replica, if there is one, unless `primary` is set.
+    """
+    session = (db_session if primary else db_read_session).get()
+
+    now = role_expiry.utcnow()
+    bits = dict.fromkeys(user_ids, bitmap.EMPTY)
+    expiries: dict[UUID, datetime] = {}
+    stored = select(UserEffectivePermission.user_id, UserEffectivePermission.permission_id).where(
+        UserEffectivePermission.user_id.in_(user_ids)
+    )
+    for user_id, permission_id, expires_at in await session.execute(_with_expiries(stored, user_ids)):
+        if permission_id is None:
+            expiries[user_id] = role_expiry.as_utc(expires_at)
+        else:
+            bits[user_id] |= 1 << permission_id
+
+    lapsed = [user_id for user_id, expires_at in expiries.items() if expires_at <= now]
+    if lapsed:
+        # expired but not revoked yet: their stored rows still have the role's permissions
+        for user_id in lapsed:
+            bits[user_id] = bitmap.EMPTY
+            del expiries[user_id]
+        derived = effective_permissions.derived().where(UserRole.user_id.in_(lapsed))
+        for user_id, permission_id, expires_at in await session.execute(
+            _with_expiries(derived, lapsed, after=now)
+        ):
+            if permission_id is None:
+                expiries[user_id] = role_expiry.as_utc(expires_at)
+            else:
+                bits[user_id] |= 1 << permission_id
+    return bits, expiries
+
+
+async def _fill_bits(
+    user_ids: list[UUID],
+) -> tuple[dict[UUID, int], dict[UUID, datetime], set[UUID]]:
+    """_query_bits for filling the caches, plus which users were read from the replica.
+
+    Users invalidated in the last REPLICA_LAG_WINDOW seconds are read from
+    the primary: the replica may not have the write that evicted them yet.
+    """
+    if not _has_replica:
+        return *await _query_bits(user_ids), set()
+
+    recent = [user_id for user_id in user_ids if recently_invalidated(user_id)]
+    replica = [user_id for user_id in user_ids if not recently_invalidated(user_id)]
+    bits: dict[UUID, int] = {}
+    expiries: dict[UUID, datetime] = {}
+    for group, primary in ((recent, True), (replica, False)):
+        if group:
+            group_bits, group_expiries = await _query_bits(group, primary=primary)
+            bits.update(group_bits)
+            expiries.update(group_expiries)
+    return bits, expiries, set(replica)
+
+
+def _remaining(pttl: int) -> float | None:
+    """Seconds left on a redis key given its PTTL; None if it has no expiry."""
+    # -2: deleted between the GET and the PTTL, so don't keep it locally either
+    return None if pttl == -1 else max(pttl, 0) / 1000
+
+
+def _seconds_until(when: datetime) -> float:
+    return (when - role_expiry.utcnow()).total_seconds()
+
+
+def _cache_ttl(bits: int, expires_at: datetime | None = None, from_replica: bool = False) -> int:
+    ttl = NEGATIVE_CACHE_TTL if bits == bitmap.EMPTY else CACHE_TTL
+    if from_replica:
+        # bounds how long a bitmap read behind a write can outlive the eviction
+        ttl = min(ttl, settings.REPLICA_CACHE_TTL)
+    if expires_at is not None:
+        # gone from redis by the time the role expires (to the second; redis wants at least 1)
+        ttl = min(ttl, max(1, int(_seconds_until(expires_at))))
+    return ttl
+
+
+async def can(user_id: UUID, permission: str) -> bool:
+    with metrics.RESOLVE_CAN.time():
+        bits = await _get_user_bits(user_id)
+        permission_id = await permission_index.id_of(permission)
+        return await _allows(bits, permission, permission_id)
+
+
+async def can_many(checks: Iterable[tuple[UUID, str]]) -> list[bool]:
+    with metrics.RESOLVE_CAN_MANY.time():
+        checks = list(checks)
+        bits = await _get_users_bits(user_id for user_id, _ in checks)
+        ids = await permission_index.ids_of(permission for _, permission in checks)
+        return [
+            await _allows(bits[user_id], permission, ids.get(permission))
+            for user_id, permission in checks
+        ]
+
+
+async def _allows(bits: int, permission: str, permission_id: int | None) -> bool:
+    if permission_id is None:
+        permission_id = await permission_index.id_in(permission, bits)
+    if permission_id is not None and bitmap.has(bits, permission_id):
+        return True
+    matcher = await permission_index.matcher_for(bits)
+    return matcher is not None and matcher.matches(permission)
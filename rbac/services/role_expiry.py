@@ -0,0 +1,105 @@
+"""Revocation of time-bound role assignments.
+
+`user_roles.expires_at` has a partial index over the assignments that
+expire, so the scheduler never scans the table: it reads the earliest
+expiry, sleeps until then and revokes what has expired, a batch per
+transaction, recomputing only the users who held those assignments and
+invalidating them through the outbox. An assignment made through this
+instance that expires sooner wakes it early; ones made through other
+instances are noticed within EXPIRY_MAX_SLEEP.
+
+The scheduler does the cleanup, not the revocation: reads already leave
+out an assignment once it has expired (see permission_service._query_bits)
+and cached bitmaps of users holding one never outlive its expiry.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, tuple_
+
+from core.config import settings
+from core.database import db_session, session_scope
+from models.user_role import UserRole
+from services import effective_permissions, outbox
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 1.0
+# an expiry whose rows another instance has locked is retried after this
+MIN_SLEEP = 0.1
+
+_wakeup = asyncio.Event()
+# when the scheduler will next look, if it is sleeping
+_next_run: datetime | None = None
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    # sqlite hands timestamps back naive; they were written in UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def schedule(expires_at: datetime) -> None:
+    """Call after committing an assignment that expires at `expires_at`."""
+    if _next_run is None or expires_at < _next_run:
+        _wakeup.set()
+
+
+async def revoke_expired() -> int:
+    """Revoke one batch of expired assignments; returns how many there were."""
+    session = db_session.get()
+    now = utcnow()
+    expired = (await session.execute(
+        select(UserRole.user_id, UserRole.role_id)
+        .where(UserRole.expires_at <= now)
+        .order_by(UserRole.expires_at)
+        .limit(settings.EXPIRY_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )).all()
+    if not expired:
+        return 0
+
+    await session.execute(
+        delete(UserRole).where(tuple_(UserRole.user_id, UserRole.role_id).in_(expired))
+    )
+    changed = await effective_permissions.refresh_users({user_id for user_id, _ in expired})
+    outbox.record("roles.expired", {
+        "assignments": [{"user_id": u, "role_id": r} for u, r in expired],
+    }, changed)
+    await session.commit()
+    outbox.notify(changed)
+    return len(expired)
+
+
+async def next_expiry() -> datetime | None:
+    expires_at = await db_session.get().scalar(select(func.min(UserRole.expires_at)))
+    return as_utc(expires_at) if expires_at is not None else None
+
+
+async def run_expiry_scheduler() -> None:
+    global _next_run
+    while True:
+        _wakeup.clear()
+        try:
+            async with session_scope():
+                while await revoke_expired() == settings.EXPIRY_BATCH_SIZE:
+                    pass
+                upcoming = await next_expiry()
+        except Exception:
+            logger.exception("revoking expired roles failed, retrying in %.0fs", RETRY_DELAY)
+            await asyncio.sleep(RETRY_DELAY)
+            continue
+
+        delay = settings.EXPIRY_MAX_SLEEP
+        if upcoming is not None:
+            delay = min(delay, max(MIN_SLEEP, (upcoming - utcnow()).total_seconds()))
+        _next_run = utcnow() + timedelta(seconds=delay)
+        try:
+            await asyncio.wait_for(_wakeup.wait(), delay)
+        except TimeoutError:
+            pass
+        _next_run = None
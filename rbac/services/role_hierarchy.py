@@ -0,0 +1,150 @@
+"""Role inheritance edges and their transitive closure.
+
+A child role inherits every permission of its parents (and theirs, and so
+on). `role_closure` is kept in step with `role_inheritance` inside the same
+transaction: inserting an edge adds the cross product of the parent's
+ancestors and the child's descendants; deleting one recomputes the closure
+of the child's subtree only. None of these functions commit.
+"""
+from uuid import UUID
+
+from sqlalchemy import delete, select, text, true
+from sqlalchemy.orm import aliased
+
+from core.database import db_session, insert_ignore
+from models.role import Role
+from models.role_closure import RoleClosure
+from models.role_inheritance import RoleInheritance
+
+# arbitrary key for pg_advisory_xact_lock; serializes hierarchy edits so two
+# concurrent edges can't close a cycle that neither saw on its own
+HIERARCHY_LOCK_KEY = 0x7262_6163
+
+
+class RoleCycleError(ValueError):
+    pass
+
+
+async def _lock_hierarchy() -> None:
+    session = db_session.get()
+    if session.bind.dialect.name == "postgresql":
+        await session.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": HIERARCHY_LOCK_KEY}
+        )
+
+
+def descendants_of(*role_ids: UUID):
+    """Ids of `role_ids` and every role inheriting from them, as a subquery."""
+    return select(RoleClosure.descendant_id).where(RoleClosure.ancestor_id.in_(role_ids))
+
+
+async def add_role(role_id: UUID) -> None:
+    session = db_session.get()
+    await session.execute(
+        insert_ignore(RoleClosure).values(ancestor_id=role_id, descendant_id=role_id)
+    )
+
+
+async def add_edge(parent_id: UUID, child_id: UUID) -> bool:
+    session = db_session.get()
+    await _lock_hierarchy()
+
+    if parent_id == child_id:
+        raise RoleCycleError("a role can't inherit from itself")
+    # child already an ancestor of parent -> the new edge would close a loop
+    cycle = await session.scalar(
+        select(RoleClosure.ancestor_id).where(
+            RoleClosure.ancestor_id == child_id,
+            RoleClosure.descendant_id == parent_id,
+        )
+    )
+    if cycle is not None:
+        raise RoleCycleError("role inheritance can't contain cycles")
+
+    inserted = await session.execute(
+        insert_ignore(RoleInheritance)
+        .values(parent_id=parent_id, child_id=child_id)
+        .returning(RoleInheritance.child_id)
+    )
+    if inserted.first() is None:
+        return False
+
+    up = aliased(RoleClosure)
+    down = aliased(RoleClosure)
+    await session.execute(
+        insert_ignore(RoleClosure).from_select(
+            ["ancestor_id", "descendant_id"],
+            select(up.ancestor_id, down.descendant_id)
+            .join(down, true())
+            .where(up.descendant_id == parent_id, down.ancestor_id == child_id),
+        )
+    )
+    return True
+
+
+async def remove_edge(parent_id: UUID, child_id: UUID) -> bool:
+    session = db_session.get()
+    await _lock_hierarchy()
+
+    deleted = await session.execute(
+        delete(RoleInheritance)
+        .where(RoleInheritance.parent_id == parent_id, RoleInheritance.child_id == child_id)
+        .returning(RoleInheritance.child_id)
+    )
+    if deleted.first() is None:
+        return False
+
+    # only the child's subtree can lose ancestors
+    subtree = set((await session.scalars(descendants_of(child_id))).all())
+    edges = (
+        await session.execute(
+            select(RoleInheritance.parent_id, RoleInheritance.child_id)
+            .where(RoleInheritance.child_id.in_(subtree))
+        )
+    ).all()
+    parents: dict[UUID, list[UUID]] = {role_id: [] for role_id in subtree}
+    for parent, child in edges:
+        parents[child].append(parent)
+
+    # ancestors of roles outside the subtree are unaffected; reuse them
+    outside = {parent for parent, _ in edges if parent not in subtree}
+    known: dict[UUID, set[UUID]] = {role_id: set() for role_id in outside}
+    rows = await session.execute(
+        select(RoleClosure.ancestor_id, RoleClosure.descendant_id)
+        .where(RoleClosure.descendant_id.in_(outside))
+    )
+    for ancestor, descendant in rows:
+        known[descendant].add(ancestor)
+
+    def ancestors(role_id: UUID) -> set[UUID]:
+        if role_id not in known:
+            found = {role_id}
+            for parent in parents[role_id]:
+                found |= ancestors(parent)
+            known[role_id] = found
+        return known[role_id]
+
+    await session.execute(
+        delete(RoleClosure).where(RoleClosure.descendant_id.in_(subtree))
+    )
+    await session.execute(
+        insert_ignore(RoleClosure),
+        [
+            {"ancestor_id": ancestor, "descendant_id": role_id}
+            for role_id in subtree
+            for ancestor in ancestors(role_id)
+        ],
+    )
+    return True
+
+
+async def backfill_closure() -> None:
+    """Give roles created before the hierarchy existed their self row."""
+    session = db_session.get()
+    await session.execute(
+        insert_ignore(RoleClosure).from_select(
+            ["ancestor_id", "descendant_id"],
+            select(Role.id.label("ancestor_id"), Role.id.label("descendant_id"))
+            .where(Role.id.is_not(None)),
+        )
+    )
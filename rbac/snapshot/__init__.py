@@ -0,0 +1,4 @@
+"""Compiled policy snapshots for offline permission checks (see format.py)."""
+from .evaluator import Snapshot, SnapshotError
+
+__all__ = ["Snapshot", "SnapshotError"]
@@ -0,0 +1,163 @@
+"""Offline permission checks against a memory-mapped policy snapshot.
+
+Needs nothing but this package and services/permission_matcher.py (for
+wildcard grants): no database, no redis, no network.
+
+    policy = Snapshot.open("policy.snap").apply("policy.delta")
+    policy.can(user_id, "wallet:read")
+
+A check is a binary search over the sorted user ids plus one bit test,
+all straight out of the page cache; the file is never read into memory
+as a whole, and processes mapping the same file share its pages.
+"""
+import heapq
+import mmap
+import os
+from typing import Iterator
+from uuid import UUID
+
+from services.permission_matcher import PermissionMatcher, is_wildcard
+from snapshot.format import FORMAT_VERSION, HEADER, MAGIC, USER_ID_BYTES, Header
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Layer:
+    """One snapshot or delta file."""
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buf) < HEADER.size:
+            raise SnapshotError(f"{path}: truncated")
+        self.header = Header(*HEADER.unpack_from(self._buf))
+        if self.header.magic != MAGIC:
+            raise SnapshotError(f"{path}: not a policy snapshot")
+        if self.header.format_version != FORMAT_VERSION:
+            raise SnapshotError(f"{path}: format version {self.header.format_version}, expected {FORMAT_VERSION}")
+
+        h = self.header
+        offsets = memoryview(self._buf)[h.names_offset:h.names_offset + 4 * (h.n_names + 1)].cast("I")
+        blob = h.names_offset + 4 * (h.n_names + 1)
+        self.names = [
+            self._buf[blob + offsets[i]:blob + offsets[i + 1]].decode()
+            for i in range(h.n_names)
+        ]
+        offsets.release()
+        self.ids = {name: i for i, name in enumerate(self.names) if name}
+        self._wildcards = [i for i, name in enumerate(self.names) if is_wildcard(name)]
+        self._sets = memoryview(self._buf)[h.user_sets_offset:h.user_sets_offset + 4 * h.n_users].cast("I")
+        self._matchers: dict[int, PermissionMatcher | None] = {}
+
+    def find(self, user_id: bytes) -> int:
+        """Index of `user_id` in this layer, or -1."""
+        buf, base = self._buf, self.header.users_offset
+        lo, hi = 0, self.header.n_users
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * USER_ID_BYTES
+            if buf[start:start + USER_ID_BYTES] < user_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = base + lo * USER_ID_BYTES
+        if lo < self.header.n_users and buf[start:start + USER_ID_BYTES] == user_id:
+            return lo
+        return -1
+
+    def _has(self, bitmap: int, permission_id: int) -> bool:
+        if permission_id >= self.header.bitmap_bytes * 8:
+            return False
+        byte = self._buf[self.header.bitmaps_offset + bitmap * self.header.bitmap_bytes + (permission_id >> 3)]
+        return bool(byte >> (permission_id & 7) & 1)
+
+    def allows(self, index: int, permission: str) -> bool:
+        bitmap = self._sets[index]
+        permission_id = self.ids.get(permission)
+        if permission_id is not None and self._has(bitmap, permission_id):
+            return True
+
+        if bitmap not in self._matchers:
+            grants = [self.names[i] for i in self._wildcards if self._has(bitmap, i)]
+            self._matchers[bitmap] = PermissionMatcher(grants) if grants else None
+        matcher = self._matchers[bitmap]
+        return matcher is not None and matcher.matches(permission)
+
+    def bits(self, index: int) -> int:
+        start = self.header.bitmaps_offset + self._sets[index] * self.header.bitmap_bytes
+        return int.from_bytes(self._buf[start:start + self.header.bitmap_bytes], "little")
+
+    def user_ids(self) -> Iterator[bytes]:
+        base = self.header.users_offset
+        for i in range(self.header.n_users):
+            yield self._buf[base + i * USER_ID_BYTES:base + (i + 1) * USER_ID_BYTES]
+
+    def close(self) -> None:
+        self._sets.release()
+        self._buf.close()
+
+
+class Snapshot:
+    """A policy snapshot with any number of deltas applied on top."""
+
+    def __init__(self, layers: list[_Layer]):
+        # newest first
+        self._layers = layers
+
+    @classmethod
+    def open(cls, path: str | os.PathLike) -> "Snapshot":
+        layer = _Layer(path)
+        if layer.header.is_delta:
+            layer.close()
+            raise SnapshotError(f"{path} is a delta; open the full snapshot and apply() it")
+        return cls([layer])
+
+    def apply(self, delta_path: str | os.PathLike) -> "Snapshot":
+        """This snapshot with `delta_path` on top; the delta must be based on our version."""
+        layer = _Layer(delta_path)
+        if not layer.header.is_delta or layer.header.base_version != self.version:
+            layer.close()
+            raise SnapshotError(
+                f"{delta_path} doesn't apply to version {self.version}"
+                f" (based on {layer.header.base_version})"
+            )
+        return Snapshot([layer, *self._layers])
+
+    @property
+    def version(self) -> int:
+        return self._layers[0].header.version
+
+    def can(self, user_id: UUID | str, permission: str) -> bool:
+        key = (user_id if isinstance(user_id, UUID) else UUID(user_id)).bytes
+        for layer in self._layers:
+            index = layer.find(key)
+            if index >= 0:
+                return layer.allows(index, permission)
+        return False
+
+    def permissions(self, user_id: UUID | str) -> set[str]:
+        key = (user_id if isinstance(user_id, UUID) else UUID(user_id)).bytes
+        for layer in self._layers:
+            index = layer.find(key)
+            if index >= 0:
+                bits = layer.bits(index)
+                return {name for i, name in enumerate(layer.names) if name and bits >> i & 1}
+        return set()
+
+    def entries(self) -> Iterator[tuple[bytes, int]]:
+        """(user id bytes, bitmap) for every user, ascending, newest layer winning."""
+        merged = heapq.merge(*(
+            ((user_id, rank, i) for i, user_id in enumerate(layer.user_ids()))
+            for rank, layer in enumerate(self._layers)
+        ))
+        last = None
+        for user_id, rank, i in merged:
+            if user_id != last:
+                last = user_id
+                yield user_id, self._layers[rank].bits(i)
+
+    def close(self) -> None:
+        for layer in self._layers:
+            layer.close()
@@ -0,0 +1,57 @@
+"""On-disk layout of policy snapshots. All integers are little-endian (the
+u32 arrays are used in place, so readers and writers must be too: x86,
+arm64).
+
+    header     HEADER, below
+    names      n_names + 1 u32 offsets into the string blob, then the blob
+               (utf-8); name i is the permission with interned id i, ""
+               for ids that aren't in use
+    users      n_users 16-byte user ids (UUID bytes), ascending
+    user_sets  n_users u32: which bitmap each user has
+    bitmaps    n_bitmaps bitmaps of `bitmap_bytes` bytes; bit i set means
+               permission id i is granted. Users with the same effective
+               permissions (i.e. the same roles) share one bitmap
+
+Sections start 8-byte aligned, at the offsets in the header. A delta has
+the same layout with DELTA set in `flags` and `base_version` naming the
+snapshot (or delta) it goes on top of. It lists only the users whose
+permissions changed; a user who lost all of them has an empty bitmap.
+"""
+import struct
+from typing import NamedTuple
+
+MAGIC = b"RBACSNAP"
+FORMAT_VERSION = 1
+# flags
+DELTA = 1
+
+USER_ID_BYTES = 16
+ALIGNMENT = 8
+
+
+class Header(NamedTuple):
+    magic: bytes
+    format_version: int
+    flags: int
+    version: int
+    base_version: int
+    created_at: int
+    n_names: int
+    n_users: int
+    n_bitmaps: int
+    bitmap_bytes: int
+    names_offset: int
+    users_offset: int
+    user_sets_offset: int
+    bitmaps_offset: int
+
+    @property
+    def is_delta(self) -> bool:
+        return bool(self.flags & DELTA)
+
+
+HEADER = struct.Struct("<8sHHQQQIIIIQQQQ")
+
+
+def aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
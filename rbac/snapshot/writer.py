@@ -0,0 +1,82 @@
+import os
+import time
+from array import array
+
+from snapshot.format import DELTA, FORMAT_VERSION, HEADER, MAGIC, USER_ID_BYTES, Header, aligned
+
+
+class SnapshotWriter:
+    """Collects users' bitmaps, in ascending user id order, then writes them out.
+
+    Holds 20 bytes per user plus one copy of each distinct bitmap.
+    """
+
+    def __init__(self):
+        self._users = bytearray()
+        self._user_sets = array("I")
+        self._bitmaps: dict[int, int] = {}
+
+    def add(self, user_id: bytes, bits: int) -> None:
+        if self._users and user_id <= self._users[-USER_ID_BYTES:]:
+            raise ValueError("snapshot users must be added in ascending user id order")
+        self._users += user_id
+        self._user_sets.append(self._bitmaps.setdefault(bits, len(self._bitmaps)))
+
+    def write(
+        self,
+        path: str | os.PathLike,
+        names: list[str],
+        version: int,
+        base_version: int | None = None,
+    ) -> Header:
+        """Write the snapshot (a delta on top of `base_version`, if given).
+
+        The file appears atomically: it is written next to `path` and renamed.
+        """
+        users, user_sets, bitmaps = self._users, self._user_sets, self._bitmaps
+        widest = max([len(names), *(bits.bit_length() for bits in bitmaps)])
+        bitmap_bytes = aligned((widest + 7) // 8)
+
+        encoded = [name.encode() for name in names]
+        name_offsets = array("I", [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+
+        names_offset = aligned(HEADER.size)
+        users_offset = aligned(names_offset + 4 * len(name_offsets) + name_offsets[-1])
+        user_sets_offset = aligned(users_offset + len(users))
+        bitmaps_offset = aligned(user_sets_offset + 4 * len(user_sets))
+        header = Header(
+            magic=MAGIC,
+            format_version=FORMAT_VERSION,
+            flags=DELTA if base_version is not None else 0,
+            version=version,
+            base_version=base_version or 0,
+            created_at=int(time.time()),
+            n_names=len(names),
+            n_users=len(users) // USER_ID_BYTES,
+            n_bitmaps=len(bitmaps),
+            bitmap_bytes=bitmap_bytes,
+            names_offset=names_offset,
+            users_offset=users_offset,
+            user_sets_offset=user_sets_offset,
+            bitmaps_offset=bitmaps_offset,
+        )
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            def section(offset: int, data: bytes) -> None:
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(data)
+
+            f.write(HEADER.pack(*header))
+            section(names_offset, name_offsets.tobytes() + b"".join(encoded))
+            section(users_offset, users)
+            section(user_sets_offset, user_sets.tobytes())
+            section(bitmaps_offset, b"")
+            for bits in bitmaps:  # insertion order == bitmap index
+                f.write(bits.to_bytes(bitmap_bytes, "little"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return header